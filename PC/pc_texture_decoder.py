@@ -1,10 +1,21 @@
 # PC/pc_texture_decoder.py
 import struct
 import io
+import numpy as np
 from PIL import Image
-from texture_decoder import TextureDecoder
+from texture_decoder import TextureDecoder, DEFAULT_BAND_ROWS
 
 class PCTextureDecoder(TextureDecoder):
+    # "numpy" decodes the blocks directly, "pil" wraps the data in a DDS header for Pillow
+    BACKENDS = ("numpy", "pil")
+
+    def __init__(self, backend="numpy", threads=1, band_rows=DEFAULT_BAND_ROWS):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown PC texture backend: {backend}")
+        self.backend = backend
+        self.threads = max(1, threads)
+        self.band_rows = max(1, band_rows)
+
     def parse_texture_header(self, data):
         OFFSET_WIDTH = 0x0C
         OFFSET_HEIGHT = 0x0E
@@ -62,13 +73,137 @@ class PCTextureDecoder(TextureDecoder):
         header[108:112] = caps1.to_bytes(4, "little")
         return header
 
+    def dds_file_header(self, width, height, texture_format, payload_size):
+        """DDS header for a texture payload of payload_size bytes, and how many of those bytes
+        should follow it: the whole mip chain, without any trailing padding."""
+        layout = self.mip_layout(width, height, texture_format, payload_size)
+        _width, _height, last_offset, last_size = layout[-1]
+        mip_count = len(layout) if len(layout) > 1 else 0
+        return self.create_dds_header(width, height, texture_format, mip_count), min(payload_size, last_offset + last_size)
+
+    def level_size(self, width, height, texture_format):
+        if texture_format == "R8G8B8A8":
+            return width * height * 4
+        return self.calculate_compressed_size(width, height, texture_format)
+
     def calculate_compressed_size(self, width, height, texture_format):
         block_size = 8 if texture_format == "DXT1" else 16
         num_blocks_wide = max(1, (width + 3) // 4)
         num_blocks_high = max(1, (height + 3) // 4)
         return num_blocks_wide * num_blocks_high * block_size
 
-    def decode_texture(self, texture_data, width, height, texture_format):
+    @staticmethod
+    def expand_rgb565(words):
+        """RGB565 to 8-bit channels by bit replication, as Pillow's BCn decoder does."""
+        words = words.astype(np.int32)
+        r = (words >> 11) & 0x1F
+        g = (words >> 5) & 0x3F
+        b = words & 0x1F
+        return np.stack(((r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)), axis=-1)
+
+    @staticmethod
+    def decode_bc1_colours(blocks, four_colour_only=False):
+        """Decode (n, 8) BC1 colour blocks into (n, 16) RGBA pixels, one uint32 per pixel."""
+        c0 = blocks[:, 0].astype(np.uint16) | (blocks[:, 1].astype(np.uint16) << 8)
+        c1 = blocks[:, 2].astype(np.uint16) | (blocks[:, 3].astype(np.uint16) << 8)
+        rgb0 = PCTextureDecoder.expand_rgb565(c0)
+        rgb1 = PCTextureDecoder.expand_rgb565(c1)
+        four_colour = ((c0 > c1) | four_colour_only)[:, None]
+        palette = np.empty((len(blocks), 4, 4), dtype=np.uint8)
+        palette[:, 0, :3] = rgb0
+        palette[:, 1, :3] = rgb1
+        palette[:, 2, :3] = np.where(four_colour, (2 * rgb0 + rgb1) // 3, (rgb0 + rgb1) // 2)
+        palette[:, 3, :3] = np.where(four_colour, (rgb0 + 2 * rgb1) // 3, 0)
+        palette[:, :3, 3] = 255
+        palette[:, 3, 3] = np.where(four_colour[:, 0], 255, 0)
+        bits = np.ascontiguousarray(blocks[:, 4:8]).view('<u4')
+        indices = ((bits >> np.arange(0, 32, 2, dtype=np.uint32)) & 0x03).astype(np.intp)
+        indices += np.arange(0, len(blocks) * 4, 4, dtype=np.intp)[:, None]
+        return palette.view(np.uint32).reshape(-1)[indices]
+
+    @staticmethod
+    def decode_bc3_alpha(blocks):
+        """Decode (n, 8) BC3 alpha blocks into (n, 16) alpha values."""
+        a0 = blocks[:, 0].astype(np.int32)[:, None]
+        a1 = blocks[:, 1].astype(np.int32)[:, None]
+        steps = np.arange(1, 7, dtype=np.int32)
+        eight_step = a0 > a1
+        table = np.empty((len(blocks), 8), dtype=np.uint8)
+        table[:, 0:1] = a0
+        table[:, 1:2] = a1
+        table[:, 2:8] = np.where(eight_step, ((7 - steps) * a0 + steps * a1) // 7, 0)
+        five_step = ((5 - steps[:4]) * a0 + steps[:4] * a1) // 5
+        table[:, 2:6] = np.where(eight_step, table[:, 2:6], five_step)
+        table[:, 6] = np.where(eight_step[:, 0], table[:, 6], 0)
+        table[:, 7] = np.where(eight_step[:, 0], table[:, 7], 255)
+        bits = np.zeros((len(blocks), 8), dtype=np.uint8)
+        bits[:, :6] = blocks[:, 2:8]
+        bits = bits.view('<u8')
+        indices = ((bits >> np.arange(0, 48, 3, dtype=np.uint64)) & 0x07).astype(np.intp)
+        indices += np.arange(0, len(blocks) * 8, 8, dtype=np.intp)[:, None]
+        return table.reshape(-1)[indices]
+
+    def decode_texture_array(self, texture_data, width, height, texture_format, tlut=None):
+        if width == 0 or height == 0:
+            return None
+        if self.backend == "pil":
+            return super().decode_texture_array(texture_data, width, height, texture_format, tlut)
+        try:
+            if texture_format == "R8G8B8A8":
+                size = width * height * 4
+                if len(texture_data) < size:
+                    raise ValueError(f"expected {size} bytes, got {len(texture_data)}")
+                bgra = np.frombuffer(texture_data, dtype=np.uint8, count=size).reshape(height, width, 4)
+                rgba = np.empty((height, width, 4), dtype=np.uint8)
+
+                def swizzle_band(first, end):
+                    rgba[first * 4:end * 4] = bgra[first * 4:end * 4, :, [2, 1, 0, 3]]
+
+                self.decode_bands((height + 3) // 4, swizzle_band)
+                return rgba
+            blocks_wide = max(1, (width + 3) // 4)
+            blocks_high = max(1, (height + 3) // 4)
+            block_size = 8 if texture_format == "DXT1" else 16
+            size = blocks_wide * blocks_high * block_size
+            if len(texture_data) < size:
+                raise ValueError(f"expected {size} bytes, got {len(texture_data)}")
+            blocks = np.frombuffer(texture_data, dtype=np.uint8, count=size).reshape(-1, block_size)
+            image = np.empty((blocks_high * 4, blocks_wide * 4, 4), dtype=np.uint8)
+            # (block_row, y, block_col, x) view of image as whole RGBA pixels
+            image_blocks = image.view(np.uint32).reshape(blocks_high, 4, blocks_wide, 4)
+
+            def decode_band(first, end):
+                band = blocks[first * blocks_wide:end * blocks_wide]
+                if texture_format == "DXT1":
+                    pixels = self.decode_bc1_colours(band)
+                else:
+                    pixels = self.decode_bc1_colours(band[:, 8:], four_colour_only=True)
+                    pixels.view(np.uint8).reshape(-1, 16, 4)[..., 3] = self.decode_bc3_alpha(band[:, :8])
+                # (block_row, block_col, y, x) -> (block_row, y, block_col, x)
+                image_blocks[first:end] = pixels.reshape(end - first, blocks_wide, 4, 4).transpose(0, 2, 1, 3)
+
+            self.decode_bands(blocks_high, decode_band)
+            return image[:height, :width]
+        except Exception as e:
+            print(f"Error decoding PC texture: {e}")
+            return None
+
+    def decode_texture(self, texture_data, width, height, texture_format, tlut=None):
+        if width == 0 or height == 0:
+            return None
+        if self.backend == "pil":
+            return self.decode_texture_pil(texture_data, width, height, texture_format)
+        if texture_format == "R8G8B8A8":
+            size = width * height * 4
+            if len(texture_data) < size:
+                print(f"Error decoding PC texture: expected {size} bytes, got {len(texture_data)}")
+                return None
+            # no DDS header or intermediate copy; Pillow swizzles BGRA straight from the buffer
+            return Image.frombuffer("RGBA", (width, height), memoryview(texture_data)[:size], "raw", "BGRA", 0, 1)
+        image = self.decode_texture_array(texture_data, width, height, texture_format)
+        return None if image is None else Image.fromarray(image, "RGBA")
+
+    def decode_texture_pil(self, texture_data, width, height, texture_format):
         if width == 0 or height == 0:
             return None
         try:
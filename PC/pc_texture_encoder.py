@@ -0,0 +1,62 @@
+# PC/pc_texture_encoder.py
+import numpy as np
+from texture_encoder import TextureEncoder
+from PC.pc_texture_decoder import PCTextureDecoder
+
+class PCTextureEncoder(TextureEncoder):
+    """Encodes RGBA pixels as DXT1, DXT5 or R8G8B8A8 data for PCTextureDecoder."""
+
+    FORMATS = ("DXT1", "DXT5", "R8G8B8A8")
+
+    def expand_565(self, words):
+        return PCTextureDecoder.expand_rgb565(words)
+
+    def interpolate(self, rgb0, rgb1, four_colour):
+        return (np.where(four_colour, (2 * rgb0 + rgb1) // 3, (rgb0 + rgb1) // 2),
+                np.where(four_colour, (rgb0 + 2 * rgb1) // 3, 0))
+
+    def is_four_colour(self, word0, word1):
+        return word0 > word1
+
+    @staticmethod
+    def pack_bc1(word0, word1, indices):
+        """(n,) endpoint words and (n, 16) indices to (n, 8) BC1 blocks."""
+        blocks = np.empty((len(word0), 8), dtype=np.uint8)
+        blocks[:, 0:2] = word0.astype('<u2')[:, None].view(np.uint8)
+        blocks[:, 2:4] = word1.astype('<u2')[:, None].view(np.uint8)
+        bits = (indices.astype(np.uint32) << np.arange(0, 32, 2, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+        blocks[:, 4:8] = bits.astype('<u4')[:, None].view(np.uint8)
+        return blocks
+
+    @staticmethod
+    def encode_bc3_alpha(alpha):
+        """(n, 16) alpha values to (n, 8) BC3 alpha blocks, always in eight-step mode."""
+        alpha = alpha.astype(np.int32)
+        a0 = alpha.max(axis=1)[:, None]
+        a1 = alpha.min(axis=1)[:, None]
+        steps = np.arange(1, 7, dtype=np.int32)
+        table = np.concatenate((a0, a1, ((7 - steps) * a0 + steps * a1) // 7), axis=1)
+        # a flat block (a0 == a1) decodes in five-step mode, where index 0 is still a0
+        indices = np.abs(alpha[:, :, None] - table[:, None, :]).argmin(axis=-1).astype(np.uint64)
+        bits = (indices << np.arange(0, 48, 3, dtype=np.uint64)).sum(axis=1, dtype=np.uint64)
+        blocks = np.empty((len(alpha), 8), dtype=np.uint8)
+        blocks[:, 0] = a0[:, 0]
+        blocks[:, 1] = a1[:, 0]
+        blocks[:, 2:8] = bits.astype('<u8')[:, None].view(np.uint8)[:, :6]
+        return blocks
+
+    def encode_level(self, pixels, texture_format):
+        height, width = pixels.shape[:2]
+        if texture_format == "R8G8B8A8":
+            return np.ascontiguousarray(pixels[..., [2, 1, 0, 3]]).tobytes()
+        if texture_format not in self.FORMATS:
+            raise ValueError(f"Unsupported PC texture format: {texture_format}")
+        blocks_wide = max(1, (width + 3) // 4)
+        blocks_high = max(1, (height + 3) // 4)
+        blocks = self.image_blocks(pixels, blocks_wide, blocks_high).reshape(-1, 16, 4)
+        if texture_format == "DXT1":
+            return self.pack_bc1(*self.compress_colours(blocks)).tobytes()
+        encoded = np.empty((len(blocks), 16), dtype=np.uint8)
+        encoded[:, :8] = self.encode_bc3_alpha(blocks[..., 3])
+        encoded[:, 8:] = self.pack_bc1(*self.compress_colours(blocks, four_colour_only=True))
+        return encoded.tobytes()
@@ -1,28 +1,94 @@
 # Wii/wii_texture_decoder.py
 import struct
+import threading
+from collections import OrderedDict
 import numpy as np
 from PIL import Image
-from texture_decoder import TextureDecoder
+from texture_decoder import TextureDecoder, DEFAULT_BAND_ROWS
+
+# GX texture formats: name -> (GX id, tile width, tile height, bits per texel).
+# Only CMPR is identified in real texture headers (see WII_FORMAT_MAGICS); the other
+# formats decode when named through the API, but no archive texture selects them yet.
+GX_FORMATS = {
+    "I4": (0x0, 8, 8, 4),
+    "I8": (0x1, 8, 4, 8),
+    "IA4": (0x2, 8, 4, 8),
+    "IA8": (0x3, 4, 4, 16),
+    "RGB565": (0x4, 4, 4, 16),
+    "RGB5A3": (0x5, 4, 4, 16),
+    "RGBA8": (0x6, 4, 4, 32),
+    "CMPR": (0xE, 8, 8, 4),
+    "C4": (0x8, 8, 8, 4),
+    "C8": (0x9, 8, 4, 8),
+    "C14X2": (0xA, 4, 4, 16),
+}
+GX_FORMAT_NAMES = {gx_id: name for name, (gx_id, _w, _h, _bpp) in GX_FORMATS.items()}
+# first two bytes of a texture header -> GX id. Other magics (0xE9 0x78 among them) are not
+# identified yet and are decoded as CMPR, as they always have been
+WII_FORMAT_MAGICS = {b'\xA1\xBC': GX_FORMATS["CMPR"][0]}
+# paletted formats -> number of TLUT entries their indices can address
+PALETTE_ENTRIES = {"C4": 16, "C8": 256, "C14X2": 16384}
+# TLUT entry formats: name -> GX TLUT id
+TLUT_FORMATS = {"IA8": 0x0, "RGB565": 0x1, "RGB5A3": 0x2}
+TLUT_FORMAT_NAMES = {tlut_id: name for name, tlut_id in TLUT_FORMATS.items()}
+# a guess: no archive has shown where a TLUT's entry format is recorded
+DEFAULT_TLUT_FORMAT = "RGB5A3"
+PALETTE_CACHE_SIZE = 64
 
 class WiiTextureDecoder(TextureDecoder):
+    # per-format tile decoders; CMPR keeps its own path in decode_texture_array
+    TILE_DECODERS = {
+        "I4": "decode_i4_tiles",
+        "I8": "decode_i8_tiles",
+        "IA4": "decode_ia4_tiles",
+        "IA8": "decode_ia8_tiles",
+        "RGB565": "decode_rgb565_tiles",
+        "RGB5A3": "decode_rgb5a3_tiles",
+        "RGBA8": "decode_rgba8_tiles",
+    }
+    # 16-bit colour formats go through a 65536-entry RGBA lookup table, built on first use
+    _colour_tables = {}
+
+    def __init__(self, threads=1, band_rows=DEFAULT_BAND_ROWS):
+        self.threads = max(1, threads)
+        self.band_rows = max(1, band_rows)
+        # decoded TLUTs, so textures sharing a palette expand it only once
+        self._palettes = OrderedDict()
+        self._palette_lock = threading.Lock()
+
     def parse_texture_header(self, data):
         OFFSET_WIDTH = 0x0C
         OFFSET_HEIGHT = 0x0E
         HEADER_MIN_LENGTH = 0x16
 
         if len(data) >= HEADER_MIN_LENGTH:
-            magic = data[:2]
-            if magic == b'\xA1\xBC':
-                texture_format = "CRMP"
-            elif magic == b'\xE9\x78':
-                texture_format = "Unknown (but showing as CRMP)"
-            else:
-                texture_format = f"Unknown (magic: {magic.hex().upper()})"
+            magic = bytes(data[:2])
+            texture_format = self.gx_format(WII_FORMAT_MAGICS.get(magic))
+            if texture_format is None:
+                texture_format = f"CMPR (assumed, magic {magic.hex().upper()})"
             width = struct.unpack('>H', data[OFFSET_WIDTH:OFFSET_WIDTH+2])[0]
             height = struct.unpack('>H', data[OFFSET_HEIGHT:OFFSET_HEIGHT+2])[0]
             return width, height, texture_format
         return 0, 0, "Unknown"
 
+    @staticmethod
+    def gx_format(texture_format):
+        """GX_FORMATS name for a format name or GX id (labels such as "CMPR (assumed, ...)"
+        count by their first word), or None if it is not a supported format."""
+        if isinstance(texture_format, int):
+            return GX_FORMAT_NAMES.get(texture_format)
+        name = texture_format.split(" ")[0] if texture_format else ""
+        return name if name in GX_FORMATS else None
+
+    def level_size(self, width, height, texture_format):
+        gx_format = self.gx_format(texture_format)
+        if gx_format is None:
+            return None
+        # every level is padded to whole tiles
+        _gx_id, tile_width, tile_height, bits = GX_FORMATS[gx_format]
+        tiles = -(-width // tile_width) * -(-height // tile_height)
+        return tiles * tile_width * tile_height * bits // 8
+
     @staticmethod
     def unpack_rgb565(color):
         color = ((color & 0xFF) << 8) | (color >> 8)
@@ -70,22 +136,297 @@ class WiiTextureDecoder(TextureDecoder):
         except Exception as e:
             pass
 
-    def decode_texture(self, texture_data, width, height, texture_format):
+    @staticmethod
+    def expand_rgb565(words):
+        """Vectorized unpack_rgb565 for big-endian words; returns an (..., 3) int32 array."""
+        words = words.astype(np.int32)
+        return np.stack((
+            ((words >> 11) & 0x1F) * 255 // 31,
+            ((words >> 5) & 0x3F) * 255 // 63,
+            (words & 0x1F) * 255 // 31,
+        ), axis=-1)
+
+    @staticmethod
+    def decode_cmpr_tiles(texture_data, blocks_wide, out=None):
+        """Decode every 32-byte CMPR tile at once.
+
+        Returns (pixels, block_count): pixels is the tile grid laid out as an
+        (rows * 8, blocks_wide * 8, 4) RGBA array, with tiles past the end of
+        texture_data left zeroed. It is written into out when given.
+        """
+        block_count = len(texture_data) // 32
+        block_rows = -(-block_count // blocks_wide)
+        tiles = np.zeros((block_rows * blocks_wide, 4, 8), dtype=np.uint8)
+        tiles[:block_count] = np.frombuffer(texture_data, dtype=np.uint8, count=block_count * 32).reshape(block_count, 4, 8)
+        raw0 = tiles[..., 0].astype(np.uint16)
+        raw1 = tiles[..., 1].astype(np.uint16)
+        raw2 = tiles[..., 2].astype(np.uint16)
+        raw3 = tiles[..., 3].astype(np.uint16)
+        rgb0 = WiiTextureDecoder.expand_rgb565((raw0 << 8) | raw1)
+        rgb1 = WiiTextureDecoder.expand_rgb565((raw2 << 8) | raw3)
+        # decode_block picks the palette mode from the raw little-endian words
+        four_colour = (((raw1 << 8) | raw0) > ((raw3 << 8) | raw2))[..., None]
+        palette = np.empty(tiles.shape[:2] + (4, 4), dtype=np.uint8)
+        palette[..., 0, :3] = rgb0
+        palette[..., 1, :3] = rgb1
+        palette[..., 2, :3] = np.where(four_colour, (2 * rgb0 + rgb1 + 1) // 3, (rgb0 + rgb1 + 1) // 2)
+        palette[..., 3, :3] = np.where(four_colour, (rgb0 + 2 * rgb1 + 1) // 3, 0)
+        palette[..., :3, 3] = 255
+        palette[..., 3, 3] = np.where(four_colour[..., 0], 255, 0)
+        palette[block_count:] = 0
+        # 2-bit indices, one byte per sub-block row, leftmost pixel in the high bits
+        shifts = np.array([6, 4, 2, 0], dtype=np.uint8)
+        indices = ((tiles[..., 4:8, None] >> shifts) & 0x03).reshape(-1, 16).astype(np.intp)
+        indices += np.arange(0, palette.shape[0] * palette.shape[1] * 4, 4, dtype=np.intp)[:, None]
+        # gather whole RGBA pixels as uint32 rather than byte by byte
+        pixels = palette.view(np.uint32).reshape(-1)[indices]
+        if out is None:
+            out = np.empty((block_rows * 8, blocks_wide * 8, 4), dtype=np.uint8)
+        # (row, col, sub_y, sub_x, y, x) -> (row, sub_y, y, col, sub_x, x)
+        out.view(np.uint32).reshape(block_rows, 2, 4, blocks_wide, 2, 4)[...] = \
+            pixels.reshape(block_rows, blocks_wide, 2, 2, 4, 4).transpose(0, 2, 4, 1, 3, 5)
+        return out, block_count
+
+    @staticmethod
+    def tile_bytes(texture_data, width, height, texture_format):
+        """texture_data as a (tiles, bytes per tile) array, zero-padded if the payload is short."""
+        _gx_id, tile_width, tile_height, bits = GX_FORMATS[texture_format]
+        tile_size = tile_width * tile_height * bits // 8
+        tile_count = -(-width // tile_width) * -(-height // tile_height)
+        size = tile_count * tile_size
+        data = np.frombuffer(texture_data, dtype=np.uint8, count=min(size, len(texture_data)))
+        if len(data) < size:
+            data = np.concatenate((data, np.zeros(size - len(data), dtype=np.uint8)))
+        return data.reshape(tile_count, tile_size)
+
+    def decode_tiles(self, tiles, width, height, texture_format, decode):
+        """Decode (tiles, bytes per tile) data into a (height, width, 4) image.
+
+        decode maps a run of tiles to their texels, shape (tiles, tile_height * tile_width, 4);
+        runs of tile rows are decoded in bands (see decode_bands).
+        """
+        _gx_id, tile_width, tile_height, _bits = GX_FORMATS[texture_format]
+        tiles_wide = -(-width // tile_width)
+        tiles_high = -(-height // tile_height)
+        image = np.empty((tiles_high * tile_height, tiles_wide * tile_width, 4), dtype=np.uint8)
+        grid = image.reshape(tiles_high, tile_height, tiles_wide, tile_width, 4)
+
+        def decode_band(first, end):
+            texels = decode(tiles[first * tiles_wide:end * tiles_wide])
+            # (tile_row, tile_col, y, x) -> (tile_row, y, tile_col, x)
+            grid[first:end] = texels.reshape(end - first, tiles_wide, tile_height, tile_width, 4).swapaxes(1, 2)
+
+        self.decode_bands(tiles_high, decode_band)
+        return np.ascontiguousarray(image[:height, :width])
+
+    @staticmethod
+    def intensity_alpha(intensity, alpha):
+        return np.stack((intensity, intensity, intensity, alpha), axis=-1).astype(np.uint8)
+
+    @staticmethod
+    def expand_bits(values, bits):
+        """Scale bits-wide channel values to 8 bits by bit replication."""
+        values = values.astype(np.uint16) << (8 - bits)
+        return (values | (values >> bits) | (values >> (2 * bits))).astype(np.uint8)
+
+    @staticmethod
+    def decode_i4_tiles(tiles):
+        # two texels per byte, the left one in the high nibble
+        nibbles = np.stack((tiles >> 4, tiles & 0x0F), axis=-1).reshape(len(tiles), -1) * 17
+        return WiiTextureDecoder.intensity_alpha(nibbles, nibbles)
+
+    @staticmethod
+    def decode_i8_tiles(tiles):
+        return WiiTextureDecoder.intensity_alpha(tiles, tiles)
+
+    @staticmethod
+    def decode_ia4_tiles(tiles):
+        return WiiTextureDecoder.intensity_alpha((tiles & 0x0F) * 17, (tiles >> 4) * 17)
+
+    @staticmethod
+    def decode_ia8_tiles(tiles):
+        pairs = tiles.reshape(len(tiles), -1, 2)
+        return WiiTextureDecoder.intensity_alpha(pairs[..., 1], pairs[..., 0])
+
+    @staticmethod
+    def rgb565_colours(words):
+        expand = WiiTextureDecoder.expand_bits
+        rgba = np.empty(words.shape + (4,), dtype=np.uint8)
+        rgba[..., 0] = expand((words >> 11) & 0x1F, 5)
+        rgba[..., 1] = expand((words >> 5) & 0x3F, 6)
+        rgba[..., 2] = expand(words & 0x1F, 5)
+        rgba[..., 3] = 255
+        return rgba
+
+    @staticmethod
+    def rgb5a3_colours(words):
+        # top bit set: RGB555 and opaque, otherwise A3 RGB444
+        expand = WiiTextureDecoder.expand_bits
+        opaque = (words & 0x8000) != 0
+        rgba = np.empty(words.shape + (4,), dtype=np.uint8)
+        rgba[..., 0] = np.where(opaque, expand((words >> 10) & 0x1F, 5), expand((words >> 8) & 0x0F, 4))
+        rgba[..., 1] = np.where(opaque, expand((words >> 5) & 0x1F, 5), expand((words >> 4) & 0x0F, 4))
+        rgba[..., 2] = np.where(opaque, expand(words & 0x1F, 5), expand(words & 0x0F, 4))
+        rgba[..., 3] = np.where(opaque, 255, expand((words >> 12) & 0x07, 3))
+        return rgba
+
+    @staticmethod
+    def ia8_colours(words):
+        intensity = (words & 0xFF).astype(np.uint8)
+        return WiiTextureDecoder.intensity_alpha(intensity, (words >> 8).astype(np.uint8))
+
+    @staticmethod
+    def colour_table(name):
+        """RGBA of every 16-bit value of a colour format, as a (65536,) uint32 array."""
+        table = WiiTextureDecoder._colour_tables.get(name)
+        if table is None:
+            words = np.arange(65536, dtype=np.uint32)
+            table = getattr(WiiTextureDecoder, name + "_colours")(words).view(np.uint32).reshape(-1)
+            WiiTextureDecoder._colour_tables[name] = table
+        return table
+
+    @staticmethod
+    def lookup_colours(tiles, name):
+        words = tiles.view('>u2')
+        return WiiTextureDecoder.colour_table(name)[words].view(np.uint8).reshape(words.shape + (4,))
+
+    @staticmethod
+    def decode_rgb565_tiles(tiles):
+        return WiiTextureDecoder.lookup_colours(tiles, "rgb565")
+
+    @staticmethod
+    def decode_rgb5a3_tiles(tiles):
+        return WiiTextureDecoder.lookup_colours(tiles, "rgb5a3")
+
+    @staticmethod
+    def decode_rgba8_tiles(tiles):
+        # each 64-byte tile holds 16 AR pairs, then 16 GB pairs
+        halves = tiles.reshape(len(tiles), 2, 16, 2)
+        return np.stack((halves[:, 0, :, 1], halves[:, 1, :, 0], halves[:, 1, :, 1], halves[:, 0, :, 0]), axis=-1)
+
+    @staticmethod
+    def palette_size(texture_format):
+        """Bytes in a full TLUT for a paletted format, or 0 for any other format."""
+        return PALETTE_ENTRIES.get(WiiTextureDecoder.gx_format(texture_format), 0) * 2
+
+    def split_tlut(self, texture_data, width, height, texture_format):
+        """Split a paletted texture payload into (image data, tlut).
+
+        Speculative: no TLUT record or header field has been found in the known archives,
+        and no texture header maps to a paletted format yet (see WII_FORMAT_MAGICS). A TLUT
+        is only assumed when the payload is exactly one image level followed by a full
+        palette, and its entry format is guessed (DEFAULT_TLUT_FORMAT); anything else (a mip
+        chain, for one) is left whole. Don't treat the palette returned as authoritative.
+        tlut is (tlut bytes, DEFAULT_TLUT_FORMAT), or None.
+        """
+        palette_size = self.palette_size(texture_format)
+        if not palette_size or len(texture_data) != self.level_size(width, height, texture_format) + palette_size:
+            return texture_data, None
+        data = memoryview(texture_data)
+        return data[:len(data) - palette_size], (data[len(data) - palette_size:], DEFAULT_TLUT_FORMAT)
+
+    def decode_palette(self, tlut_data, tlut_format=DEFAULT_TLUT_FORMAT):
+        """Expand a TLUT of big-endian 16-bit entries to a (entries,) uint32 RGBA array.
+
+        Results are cached per TLUT, so textures sharing a palette expand it only once.
+        """
+        if isinstance(tlut_format, int):
+            tlut_format = TLUT_FORMAT_NAMES.get(tlut_format, DEFAULT_TLUT_FORMAT)
+        key = (bytes(tlut_data), tlut_format)
+        with self._palette_lock:
+            palette = self._palettes.get(key)
+            if palette is not None:
+                self._palettes.move_to_end(key)
+                return palette
+        words = np.frombuffer(key[0], dtype='>u2', count=len(key[0]) // 2)
+        palette = self.colour_table(tlut_format.lower())[words]
+        with self._palette_lock:
+            self._palettes[key] = palette
+            while len(self._palettes) > PALETTE_CACHE_SIZE:
+                self._palettes.popitem(last=False)
+        return palette
+
+    @staticmethod
+    def palette_indices(tiles, texture_format):
+        if texture_format == "C4":
+            return np.stack((tiles >> 4, tiles & 0x0F), axis=-1).reshape(len(tiles), -1)
+        if texture_format == "C8":
+            return tiles
+        return tiles.view('>u2') & 0x3FFF
+
+    def decode_paletted(self, texture_data, width, height, texture_format, tlut):
+        """Decode a C4/C8/C14X2 texture with one gather through its palette.
+
+        Without a TLUT the indices are shown as a grey ramp.
+        """
+        entries = PALETTE_ENTRIES[texture_format]
+        if tlut is None:
+            ramp = (np.arange(entries) * 255 // (entries - 1)).astype(np.uint8)
+            palette = self.intensity_alpha(ramp, np.full(entries, 255, dtype=np.uint8)).view(np.uint32).reshape(-1)
+        else:
+            palette = self.decode_palette(*tlut)
+        if len(palette) < entries:
+            # indices past the end of a short TLUT come out transparent black
+            palette = np.concatenate((palette, np.zeros(entries - len(palette), dtype=np.uint32)))
+
+        def decode(tiles):
+            indices = self.palette_indices(tiles, texture_format)
+            return palette[indices].view(np.uint8).reshape(indices.shape + (4,))
+
+        return self.decode_tiles(self.tile_bytes(texture_data, width, height, texture_format),
+                                 width, height, texture_format, decode)
+
+    def decode_texture_array(self, texture_data, width, height, texture_format, tlut=None):
+        """tlut is (tlut bytes, TLUT format name or id) for paletted formats; see split_tlut."""
         if width == 0 or height == 0:
             return None
+        gx_format = self.gx_format(texture_format)
+        if gx_format is None:
+            print(f"Unsupported Wii texture format: {texture_format}")
+            return None
+        if gx_format in PALETTE_ENTRIES:
+            try:
+                return self.decode_paletted(texture_data, width, height, gx_format, tlut)
+            except Exception as e:
+                print(f"Error decoding {gx_format} texture: {e}")
+                return None
+        if gx_format != "CMPR":
+            try:
+                tiles = self.tile_bytes(texture_data, width, height, gx_format)
+                return self.decode_tiles(tiles, width, height, gx_format, getattr(self, self.TILE_DECODERS[gx_format]))
+            except Exception as e:
+                print(f"Error decoding {gx_format} texture: {e}")
+                return None
         try:
-            image = np.zeros((height, width, 4), dtype=np.uint8)
             blocks_wide = (width + 7) // 8
-            for block_idx in range(len(texture_data) // 32):
-                block_y = block_idx // blocks_wide
-                block_x = block_idx % blocks_wide
-                block_data = texture_data[block_idx*32 : block_idx*32+32]
-                for i, (dx, dy) in enumerate([(0,0), (4,0), (0,4), (4,4)]):
-                    x = block_x * 8 + dx
-                    y = block_y * 8 + dy
-                    subblock = block_data[i*8 : i*8+8]
-                    self.decode_block(subblock, x, y, image, width, height)
-            return Image.fromarray(image, "RGBA")
+            block_count = len(texture_data) // 32
+            image = np.zeros((height, width, 4), dtype=np.uint8)
+            if block_count == 0:
+                return image
+            block_rows = -(-block_count // blocks_wide)
+            tiles = np.empty((block_rows * 8, blocks_wide * 8, 4), dtype=np.uint8)
+            data = memoryview(texture_data)
+            row_bytes = blocks_wide * 32
+
+            def decode_band(first, end):
+                self.decode_cmpr_tiles(data[first * row_bytes:end * row_bytes], blocks_wide, tiles[first * 8:end * 8])
+
+            self.decode_bands(block_rows, decode_band)
+            # Pixels past the right/bottom edge are clamped onto the last column/row,
+            # so those take the value of the last tile pixel written there.
+            inner_rows = min(height - 1, tiles.shape[0])
+            image[:inner_rows, :width - 1] = tiles[:inner_rows, :width - 1]
+            image[:inner_rows, width - 1] = tiles[:inner_rows, -1]
+            columns = np.append(np.arange(width - 1), tiles.shape[1] - 1)
+            block_x = columns // 8
+            last_row = ((block_count - 1 - block_x) // blocks_wide) * 8 + 7
+            written = (block_x < block_count) & (last_row >= height - 1)
+            image[height - 1, written] = tiles[last_row[written], columns[written]]
+            return image
         except Exception as e:
-            print(f"Error decoding CRMP texture: {e}")
+            print(f"Error decoding CMPR texture: {e}")
             return None
+
+    def decode_texture(self, texture_data, width, height, texture_format, tlut=None):
+        image = self.decode_texture_array(texture_data, width, height, texture_format, tlut)
+        return None if image is None else Image.fromarray(image, "RGBA")
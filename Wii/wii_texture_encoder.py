@@ -0,0 +1,36 @@
+# Wii/wii_texture_encoder.py
+import numpy as np
+from texture_encoder import TextureEncoder
+from Wii.wii_texture_decoder import WiiTextureDecoder
+
+class WiiTextureEncoder(TextureEncoder):
+    """Encodes RGBA pixels as CMPR data for WiiTextureDecoder."""
+
+    def expand_565(self, words):
+        return WiiTextureDecoder.expand_rgb565(words)
+
+    def interpolate(self, rgb0, rgb1, four_colour):
+        return (np.where(four_colour, (2 * rgb0 + rgb1 + 1) // 3, (rgb0 + rgb1 + 1) // 2),
+                np.where(four_colour, (rgb0 + 2 * rgb1 + 1) // 3, 0))
+
+    def is_four_colour(self, word0, word1):
+        # the decoder compares the big-endian endpoints as little-endian words
+        return word0.byteswap() > word1.byteswap()
+
+    def encode_level(self, pixels, texture_format):
+        if WiiTextureDecoder.gx_format(texture_format) != "CMPR":
+            raise ValueError(f"Unsupported Wii texture format for encoding: {texture_format}")
+        height, width = pixels.shape[:2]
+        tiles_wide = max(1, (width + 7) // 8)
+        tiles_high = max(1, (height + 7) // 8)
+        blocks = self.image_blocks(pixels, tiles_wide * 2, tiles_high * 2)
+        # (row, sub_y, col, sub_x) -> (row, col, sub_y, sub_x): each 8x8 tile holds its 4x4 blocks TL, TR, BL, BR
+        blocks = blocks.reshape(tiles_high, 2, tiles_wide, 2, 16, 4).transpose(0, 2, 1, 3, 4, 5).reshape(-1, 16, 4)
+        word0, word1, indices = self.compress_colours(blocks)
+        encoded = np.empty((len(blocks), 8), dtype=np.uint8)
+        encoded[:, 0:2] = word0.astype('>u2')[:, None].view(np.uint8)
+        encoded[:, 2:4] = word1.astype('>u2')[:, None].view(np.uint8)
+        # one byte per row, leftmost pixel in the high bits
+        rows = indices.reshape(-1, 4, 4).astype(np.uint8) << np.array([6, 4, 2, 0], dtype=np.uint8)
+        encoded[:, 4:8] = rows.sum(axis=-1, dtype=np.uint8)
+        return encoded.tobytes()
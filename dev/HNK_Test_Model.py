@@ -1,32 +1,23 @@
 import struct
 import os
+import sys
 import math
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hunkfile_reader import iter_records
+from io_scheduler import ReadRequest, read_all
 
-def read_hunkfile(filename):
-    records = []
-    with open(filename, 'rb') as f:
-        while True:
-            size_bytes = f.read(4)
-            if not size_bytes:
-                break
-
-            type_bytes = f.read(4)
-            if not type_bytes:
-                break
-
-            record_size = struct.unpack("<I", size_bytes)[0]
-            record_type = struct.unpack("<I", type_bytes)[0]
-            data = f.read(record_size)
+MODEL_RECORD_TYPES = (0x40071, 0x40054, 0x20055)
 
-            if len(data) < record_size:
-                break
 
-            records.append((record_type, data))
-
-    return records
+def read_hunkfile(filename):
+    # only the model records are read, sorted and merged into as few reads as possible
+    records = [record for record in iter_records(filename) if record.type in MODEL_RECORD_TYPES]
+    payloads = read_all([ReadRequest(filename, record.offset, record.size) for record in records])
+    for record, data in zip(records, payloads):
+        yield record.type, data
 
 
 # Detect vertex size using FFFFFFFF separators
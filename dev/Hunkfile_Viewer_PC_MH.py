@@ -4,7 +4,11 @@ from tkinter import filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
 import struct
 import io
+import os
+import sys
 from PIL import Image, ImageTk
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hunkfile_reader import iter_payloads
 
 # Define all record type constants
 RECORD_TYPE_HUNKFILE_HEADER = 0x40070
@@ -179,28 +183,11 @@ class HunkfileViewer:
     def read_hunkfile(self, filename):
         """Reads the HNK file and parses its record structure."""
         records = []
-        with open(filename, 'rb') as fp:
-            while True:
-                # Read record size (4 bytes, unsigned int)
-                record_size_bytes = fp.read(4)
-                if not record_size_bytes: # End of file
-                    break
-                # Read record type (4 bytes, unsigned int)
-                record_type_bytes = fp.read(4)
-                if not record_type_bytes:
-                    messagebox.showwarning("Warning", "Malformed HNK file: Unexpected EOF while reading record type.")
-                    break
-
-                record_size = struct.unpack('<I', record_size_bytes)[0]
-                record_type = struct.unpack('<I', record_type_bytes)[0]
-
-                # Read the actual record data
-                data = fp.read(record_size)
-                if len(data) < record_size:
-                    messagebox.showwarning("Warning", f"Malformed HNK file: Expected {record_size} bytes for record type 0x{record_type:X}, got {len(data)}.")
-                    break
-                
-                records.append((record_size, record_type, data, fp.tell()))
+        warnings = []
+        for record, data in iter_payloads(filename, warnings=warnings):
+            records.append((record.size, record.type, data, record.offset + record.size))
+        for warning in warnings:
+            messagebox.showwarning("Warning", warning)
         return records
 
     def parse_filename_header(self, data):
@@ -7,6 +7,9 @@ import io
 from PIL import Image, ImageTk
 import numpy as np
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hunkfile_reader import iter_payloads
 
 # Define record type constants
 RECORD_TYPE_FILENAME = 0x40071
@@ -209,25 +212,11 @@ class HunkfileViewer:
     def read_hunkfile(self, filename):
         """Reads the HNK file and parses its basic record structure."""
         records = []
-        with open(filename, 'rb') as fp:
-            while True:
-                record_size_bytes = fp.read(4)
-                if not record_size_bytes:
-                    break
-                record_type_bytes = fp.read(4)
-                if not record_type_bytes:
-                    messagebox.showwarning("Warning", "Malformed HNK file: Unexpected EOF while reading record type.")
-                    break
-
-                record_size = struct.unpack('<I', record_size_bytes)[0]
-                record_type = struct.unpack('<I', record_type_bytes)[0]
-
-                data = fp.read(record_size)
-                if len(data) < record_size:
-                    messagebox.showwarning("Warning", f"Malformed HNK file: Expected {record_size} bytes for record type 0x{record_type:X}, got {len(data)}.")
-                    break
-                
-                records.append((record_size, record_type, data, fp.tell()))
+        warnings = []
+        for record, data in iter_payloads(filename, warnings=warnings):
+            records.append((record.size, record.type, data, record.offset + record.size))
+        for warning in warnings:
+            messagebox.showwarning("Warning", warning)
         return records
 
     def parse_filename_header(self, data):
@@ -1,8 +1,12 @@
-import struct
 import os
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hunkfile_reader import iter_records
+from extract_records import RecordJob, extract_jobs
+
 
 PC_VERTEX = 0x40054
 PC_INDEX = 0x20055
@@ -11,40 +15,11 @@ WII_VERTEX = 0x202031
 WII_INDEX = 0x202032
 
 
-def read_hnk(path):
-
-    records = []
-
-    with open(path, "rb") as f:
-
-        while True:
-
-            size_bytes = f.read(4)
-            if not size_bytes:
-                break
-
-            type_bytes = f.read(4)
-            if not type_bytes:
-                break
-
-            size = struct.unpack("<I", size_bytes)[0]
-            rtype = struct.unpack("<I", type_bytes)[0]
-
-            data = f.read(size)
-
-            if len(data) < size:
-                break
+def detect_platform(path):
 
-            records.append((rtype, data))
+    for record in iter_records(path):
 
-    return records
-
-
-def detect_platform(records):
-
-    for t, _ in records:
-
-        if t in (WII_VERTEX, WII_INDEX):
+        if record.type in (WII_VERTEX, WII_INDEX):
             return "Wii"
 
     return "PC"
@@ -52,9 +27,7 @@ def detect_platform(records):
 
 def dump_chunks(path):
 
-    records = read_hnk(path)
-
-    platform = detect_platform(records)
+    platform = detect_platform(path)
 
     if platform == "PC":
         vertex_id = PC_VERTEX
@@ -67,33 +40,27 @@ def dump_chunks(path):
 
     output_dir = os.path.dirname(path)
 
-    vcount = 1
-    icount = 1
-
-    for rtype, data in records:
-
-        if rtype == vertex_id:
-
-            out = os.path.join(output_dir, f"vertex_{vcount}.bin")
-
-            with open(out, "wb") as f:
-                f.write(data)
+    counts = {vertex_id: 0, index_id: 0}
+    prefixes = {vertex_id: "vertex", index_id: "index"}
+    jobs = []
 
-            print("Saved:", out)
+    for number, record in enumerate(iter_records(path)):
 
-            vcount += 1
+        if record.type in counts:
 
+            counts[record.type] += 1
 
-        elif rtype == index_id:
+            out = os.path.join(output_dir, f"{prefixes[record.type]}_{counts[record.type]}.bin")
 
-            out = os.path.join(output_dir, f"index_{icount}.bin")
+            jobs.append(RecordJob(path, number, record, out))
 
-            with open(out, "wb") as f:
-                f.write(data)
+    # the blobs are copied file to file on a thread pool, never read into Python
+    for job, error in extract_jobs(jobs):
 
-            print("Saved:", out)
+        if error is not None:
+            raise IOError(f"{job.output}: {error}")
 
-            icount += 1
+        print("Saved:", job.output)
 
 
 def select_file():
@@ -0,0 +1,263 @@
+# export_textures.py
+# Headless bulk export of every texture in one or more .hnk archives to PNG or raw DDS
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from PIL import Image
+from record_types import *
+from hunkfile_reader import HunkfileReader, copy_range, header_platform, parse_filename_header, read_payload
+from io_scheduler import ReadRequest, disk_order, plan_reads
+from PC.pc_texture_decoder import PCTextureDecoder
+from Wii.wii_texture_decoder import WiiTextureDecoder
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# header record type -> (platform, header layout); None means the platform comes from the Hunkfile header
+TEXTURE_HEADER_TYPES = {
+    TSE_TEXTURE_HEADER: (None, "default"),
+    TSE_TEXTURE_HEADER_SCOOBY_DOO: ("PC", "scooby-doo"),
+    TSE_TEXTURE_HEADER_SCOOBY_DOO_WII: ("Wii", "scooby-doo"),
+}
+TEXTURE_DATA_TYPES = (
+    TSE_TEXTURE_DATA, TSE_TEXTURE_DATA_WII, TSE_TEXTURE_DATA_2,
+    TSE_TEXTURE_DATA_SCOOBY_DOO, TSE_TEXTURE_DATA_SCOOBY_DOO_WII,
+)
+
+TextureJob = namedtuple('TextureJob', [
+    'archive', 'number', 'name', 'platform', 'width', 'height', 'format', 'offset', 'size', 'output'
+])
+
+_decoders = {}
+
+
+def load_scooby_decoder(platform):
+    """Load the Scooby-Doo header parser for platform from the scooby-doo folder."""
+    folder = "PC" if platform == "PC" else "Wii"
+    module_name = f"scooby_doo_{folder.lower()}_texture_decoder"
+    path = os.path.join(ROOT, "scooby-doo", folder, f"{folder.lower()}_texture_decoder.py")
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.PCTextureDecoder() if platform == "PC" else module.WiiTextureDecoder()
+
+
+def get_decoder(platform, layout="default"):
+    key = (platform, layout)
+    if key not in _decoders:
+        if layout == "scooby-doo":
+            _decoders[key] = load_scooby_decoder(platform)
+        else:
+            _decoders[key] = PCTextureDecoder() if platform == "PC" else WiiTextureDecoder()
+    return _decoders[key]
+
+
+def safe_name(name):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('._') or "texture"
+
+
+def texture_jobs(filename, output_dir, warnings=None, extension=".png", recover=False):
+    """Yield a TextureJob per texture header/data pair in filename, streaming the record headers.
+
+    Only header and filename records are read here; texture data is left for the workers.
+    With recover, damaged stretches of the archive are skipped instead of ending the walk.
+    """
+    archive_dir = os.path.join(output_dir, safe_name(os.path.splitext(os.path.basename(filename))[0]))
+    reader = HunkfileReader(filename, use_mmap=False, walk=False, recover=recover)
+    try:
+        platform = None
+        name = None
+        pending = None
+        number = 0
+        for record in reader.walk():
+            if record.type == HUNKFILE_HEADER:
+                platform = platform or header_platform(record, reader.read_at)
+            elif record.type == FILENAME_HEADER:
+                folder, name = parse_filename_header(reader.read_at(record.offset, record.size))
+            elif record.type in TEXTURE_HEADER_TYPES:
+                texture_platform, layout = TEXTURE_HEADER_TYPES[record.type]
+                texture_platform = texture_platform or platform or "Wii"
+                try:
+                    parsed = get_decoder(texture_platform, layout).parse_texture_header(
+                        reader.read_at(record.offset, record.size))
+                except Exception:
+                    parsed = None
+                pending = (texture_platform, parsed) if parsed else None
+            elif record.type in TEXTURE_DATA_TYPES and pending is not None:
+                texture_platform, (width, height, texture_format) = pending
+                pending = None
+                if width <= 0 or height <= 0:
+                    continue
+                base = safe_name(name) if name and name != "ErrorParsing" else "texture"
+                output = os.path.join(archive_dir, f"{number:04d}_{base}{extension}")
+                yield TextureJob(filename, number, base, texture_platform, width, height,
+                                 texture_format, record.offset, record.size, output)
+                number += 1
+    finally:
+        if warnings is not None:
+            warnings.extend(reader.warnings)
+        reader.close()
+
+
+def export_texture(job, texture_data=None):
+    """Decode one texture and write it as PNG. texture_data is its payload, read from the archive if not given.
+
+    Returns (job, error message or None).
+    """
+    try:
+        decoder = get_decoder(job.platform)
+        if texture_data is None:
+            with open(job.archive, 'rb') as f:
+                texture_data = read_payload(f, job.offset, job.size)
+        texture_data, tlut = decoder.split_tlut(texture_data, job.width, job.height, job.format)
+        width, height, level_data = decoder.mip_levels(texture_data, job.width, job.height, job.format)[0]
+        pixels = decoder.decode_texture_array(level_data, width, height, job.format, tlut)
+        if pixels is None:
+            return job, f"could not decode {job.format} texture"
+        os.makedirs(os.path.dirname(job.output), exist_ok=True)
+        Image.fromarray(pixels, "RGBA").save(job.output, compress_level=1)
+        return job, None
+    except Exception as e:
+        return job, str(e)
+
+
+def export_span(span, jobs):
+    """Read one coalesced span of an archive (see io_scheduler) and export every texture in it as PNG.
+    Runs in a worker process.
+
+    Returns a list of (job, error message or None).
+    """
+    try:
+        with open(span.path, 'rb') as f:
+            data = memoryview(read_payload(f, span.start, span.end - span.start))
+    except (OSError, ValueError) as e:
+        return [(job, str(e)) for job in jobs]
+    return [export_texture(job, data[job.offset - span.start:job.offset - span.start + job.size]) for job in jobs]
+
+
+def export_dds(job):
+    """Write one PC texture as DDS, copying the payload without decoding it.
+
+    Returns (job, error message or None).
+    """
+    if job.platform != "PC":
+        return job, "only PC textures can be saved as DDS"
+    try:
+        header, length = get_decoder("PC").dds_file_header(job.width, job.height, job.format, job.size)
+        os.makedirs(os.path.dirname(job.output), exist_ok=True)
+        with open(job.archive, 'rb') as src, open(job.output, 'wb') as dst:
+            dst.write(header)
+            if copy_range(src, dst, job.offset, length) != length:
+                return job, "unexpected end of archive"
+        return job, None
+    except Exception as e:
+        return job, str(e)
+
+
+def find_archives(paths, extensions):
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        yield os.path.join(folder, name)
+        else:
+            yield path
+
+
+def unique_archives(archives):
+    """archives without repeats of the same file (given directly and found in a folder, say), in order."""
+    seen = set()
+    for archive in archives:
+        key = os.path.normcase(os.path.realpath(archive))
+        if key not in seen:
+            seen.add(key)
+            yield archive
+
+
+def export_archives(archives, output_dir, workers=None, verbose=True, dds=False, recover=False):
+    """Export every texture of archives under output_dir.
+
+    PNG export decodes on a process pool, each task reading a run of neighbouring
+    textures in one go; runs are capped at an even share of an archive's textures per
+    worker, so small archives still fan out over every process. DDS export only copies bytes, so it runs on threads, queued in
+    file order. Returns (textures written, failures, bytes of texture data read).
+    """
+    start = time.perf_counter()
+    archives = list(unique_archives(archives))
+    processes = workers or os.cpu_count() or 1
+    written = failed = data_bytes = total = 0
+    remaining = {}
+    futures = []
+    if dds:
+        pool_type, extension = ThreadPoolExecutor, ".dds"
+    else:
+        pool_type, extension = ProcessPoolExecutor, ".png"
+    with pool_type(max_workers=workers) as pool:
+        for archive_number, archive in enumerate(archives, 1):
+            warnings = []
+            jobs = list(texture_jobs(archive, output_dir, warnings, extension, recover))
+            requests = [ReadRequest(job.archive, job.offset, job.size) for job in jobs]
+            if dds:
+                futures.extend(pool.submit(export_dds, jobs[i]) for i in disk_order(requests))
+            else:
+                spans = plan_reads(requests, max_requests=max(1, -(-len(jobs) // processes)))
+                futures.extend(pool.submit(export_span, span, [jobs[i] for i in span.indices]) for span in spans)
+            remaining[archive] = len(jobs)
+            total += len(jobs)
+            print(f"[{archive_number}/{len(archives)}] {archive}: {len(jobs)} textures")
+            for warning in warnings:
+                print(f"  Warning: {warning}")
+            if not jobs:
+                print(f"Finished {archive}")
+        done = 0
+        for future in as_completed(futures):
+            results = [future.result()] if dds else future.result()
+            for job, error in results:
+                done += 1
+                if error is None:
+                    written += 1
+                    data_bytes += job.size
+                    if verbose:
+                        print(f"  ({done}/{total}) {job.output} ({job.width}x{job.height} {job.format})")
+                else:
+                    failed += 1
+                    print(f"  ({done}/{total}) Error exporting texture {job.number} of {job.archive}: {error}")
+                remaining[job.archive] -= 1
+                if remaining[job.archive] == 0:
+                    print(f"Finished {job.archive}")
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"Exported {written} textures ({failed} failed) from {len(archives)} archives in {elapsed:.2f} s: "
+          f"{written / elapsed:.1f} textures/s, {data_bytes / (1024 * 1024) / elapsed:.1f} MB/s")
+    return written, failed, data_bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export every texture in .hnk archives to PNG or DDS files.")
+    parser.add_argument("paths", nargs="+", help="archives, or folders to search for them")
+    parser.add_argument("-o", "--output", default="textures", help="output folder (default: textures)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("-e", "--ext", action="append", default=None,
+                        help="archive extension to search folders for, repeatable (default: .hnk)")
+    parser.add_argument("--dds", action="store_true",
+                        help="save PC textures as DDS, copying the data as-is instead of decoding it")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report errors and per-archive progress")
+    parser.add_argument("--recover", action="store_true",
+                        help="skip damaged records and carry on at the next intact one instead of stopping")
+    args = parser.parse_args(argv)
+    extensions = tuple(ext.lower() for ext in (args.ext or [".hnk"]))
+    archives = list(find_archives(args.paths, extensions))
+    if not archives:
+        print("No archives found.")
+        return 1
+    written, failed, _data_bytes = export_archives(archives, args.output, args.jobs, not args.quiet, args.dds,
+                                                   args.recover)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
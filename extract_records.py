@@ -0,0 +1,145 @@
+# extract_records.py
+# Bulk extraction of raw records from .hnk archives; payloads are copied file to file, never loaded
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import record_types
+from record_types import FILENAME_HEADER
+from hunkfile_reader import HunkfileReader, copy_range, parse_filename_header
+from export_textures import find_archives, safe_name, unique_archives
+from io_scheduler import ReadRequest, disk_order
+
+# number is the record's index in its archive, as shown by the viewer
+RecordJob = namedtuple('RecordJob', ['archive', 'number', 'record', 'output'])
+
+
+def named_records(records, read_at, types=None):
+    """Yield (index, record, name) for each record whose type is in types (every record if None).
+
+    name comes from the last FILENAME_HEADER before the record; read_at(offset, length)
+    only has to read those small headers.
+    """
+    name = None
+    for index, record in enumerate(records):
+        if record.type == FILENAME_HEADER:
+            _folder, name = parse_filename_header(read_at(record.offset, record.size))
+            if name == "ErrorParsing":
+                name = None
+        if types is None or record.type in types:
+            yield index, record, name
+
+
+def record_output(output_dir, index, record, name):
+    base = safe_name(name) if name else "record"
+    return os.path.join(output_dir, f"{index:05d}_{base}_0x{record.type:08X}.dat")
+
+
+def record_jobs(filename, output_dir, types=None, warnings=None, recover=False):
+    """Yield a RecordJob per matching record of filename, streaming the record headers."""
+    archive_dir = os.path.join(output_dir, safe_name(os.path.splitext(os.path.basename(filename))[0]))
+    reader = HunkfileReader(filename, use_mmap=False, walk=False, recover=recover)
+    try:
+        for index, record, name in named_records(reader.walk(), reader.read_at, types):
+            yield RecordJob(filename, index, record, record_output(archive_dir, index, record, name))
+    finally:
+        if warnings is not None:
+            warnings.extend(reader.warnings)
+        reader.close()
+
+
+def extract_record(job):
+    """Copy one record's payload to job.output. Returns (job, error message or None)."""
+    try:
+        os.makedirs(os.path.dirname(job.output) or ".", exist_ok=True)
+        with open(job.archive, 'rb') as src, open(job.output, 'wb') as dst:
+            if copy_range(src, dst, job.record.offset, job.record.size) != job.record.size:
+                return job, "unexpected end of archive"
+        return job, None
+    except Exception as e:
+        return job, str(e)
+
+
+def extract_jobs(jobs, workers=None):
+    """Run extract_record over jobs on a thread pool, yielding (job, error) in the order of jobs.
+
+    Jobs are queued in (archive, offset) order, so the source archives are swept front
+    to back. The copies happen in the kernel (copy_file_range/sendfile) where possible,
+    so the threads mostly wait on I/O and never hold a payload in memory.
+    """
+    jobs = list(jobs)
+    futures = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in disk_order([ReadRequest(job.archive, job.record.offset, job.record.size) for job in jobs]):
+            futures[i] = pool.submit(extract_record, jobs[i])
+        for future in futures:
+            yield future.result()
+
+
+def parse_record_type(value):
+    """A record type given as a number (0x40071, 262257) or a record_types constant name."""
+    constant = getattr(record_types, value.upper(), None)
+    if isinstance(constant, int):
+        return constant
+    try:
+        return int(value, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"unknown record type: {value}")
+
+
+def extract_archives(archives, output_dir, types=None, workers=None, verbose=True, recover=False):
+    """Extract the matching records of archives under output_dir. Returns (records written, failures, bytes)."""
+    start = time.perf_counter()
+    archives = list(unique_archives(archives))
+    written = failed = data_bytes = 0
+    jobs = []
+    for archive_number, archive in enumerate(archives, 1):
+        warnings = []
+        count = len(jobs)
+        jobs.extend(record_jobs(archive, output_dir, types, warnings, recover))
+        print(f"[{archive_number}/{len(archives)}] {archive}: {len(jobs) - count} records")
+        for warning in warnings:
+            print(f"  Warning: {warning}")
+    for done, (job, error) in enumerate(extract_jobs(jobs, workers), 1):
+        if error is None:
+            written += 1
+            data_bytes += job.record.size
+            if verbose:
+                print(f"  ({done}/{len(jobs)}) {job.output} ({job.record.size} bytes)")
+        else:
+            failed += 1
+            print(f"  ({done}/{len(jobs)}) Error extracting record {job.number} of {job.archive}: {error}")
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"Extracted {written} records ({failed} failed) from {len(archives)} archives in {elapsed:.2f} s: "
+          f"{data_bytes / (1024 * 1024) / elapsed:.1f} MB/s")
+    return written, failed, data_bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the raw records of .hnk archives to .dat files.")
+    parser.add_argument("paths", nargs="+", help="archives, or folders to search for them")
+    parser.add_argument("-o", "--output", default="records", help="output folder (default: records)")
+    parser.add_argument("-t", "--type", action="append", type=parse_record_type, default=None,
+                        help="only extract this record type, e.g. 0x40054 or TSE_TEXTURE_DATA; repeatable")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="copy threads (default: Python's thread pool default)")
+    parser.add_argument("-e", "--ext", action="append", default=None,
+                        help="archive extension to search folders for, repeatable (default: .hnk)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report errors and per-archive progress")
+    parser.add_argument("--recover", action="store_true",
+                        help="skip damaged records and carry on at the next intact one instead of stopping")
+    args = parser.parse_args(argv)
+    extensions = tuple(ext.lower() for ext in (args.ext or [".hnk"]))
+    archives = list(find_archives(args.paths, extensions))
+    if not archives:
+        print("No archives found.")
+        return 1
+    types = set(args.type) if args.type else None
+    _written, failed, _data_bytes = extract_archives(archives, args.output, types, args.jobs, not args.quiet,
+                                                     args.recover)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# hunkfile_index.py
+# Sidecar .hnkidx cache so re-opening an archive skips the header walk
+import hashlib
+import json
+import os
+from hunkfile_reader import HunkRecord
+
+INDEX_VERSION = 3
+INDEX_SUFFIX = '.hnkidx'
+FINGERPRINT_SPAN = 64 * 1024
+
+
+def index_path(filename):
+    return filename + INDEX_SUFFIX
+
+
+def content_fingerprint(filename, file_size):
+    """Hash of the first and last FINGERPRINT_SPAN bytes plus the file size."""
+    digest = hashlib.blake2b(str(file_size).encode('ascii'), digest_size=16)
+    with open(filename, 'rb') as fp:
+        digest.update(fp.read(FINGERPRINT_SPAN))
+        if file_size > FINGERPRINT_SPAN:
+            fp.seek(max(FINGERPRINT_SPAN, file_size - FINGERPRINT_SPAN))
+            digest.update(fp.read(FINGERPRINT_SPAN))
+    return digest.hexdigest()
+
+
+def archive_key(filename):
+    st = os.stat(filename)
+    return {
+        'path': os.path.abspath(filename),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'fingerprint': content_fingerprint(filename, st.st_size),
+    }
+
+
+def load_index(filename, recover=False):
+    """Return the cached index for filename, or None if missing, stale, from another version
+    or walked with a different recover setting."""
+    try:
+        with open(index_path(filename), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION:
+            return None
+        st = os.stat(filename)
+        key = index['key']
+        if (key['path'] != os.path.abspath(filename) or key['size'] != st.st_size
+                or key['mtime_ns'] != st.st_mtime_ns):
+            return None
+        if key['fingerprint'] != content_fingerprint(filename, st.st_size):
+            return None
+        if (index.get('recovered') is not None) != recover:
+            return None
+        flat = index['records']
+        return {
+            'platform': index['platform'],
+            'records': [HunkRecord(*flat[i:i + 3]) for i in range(0, len(flat), 3)],
+            'warnings': index.get('warnings', []),
+            'recovered': [tuple(skipped) for skipped in index.get('recovered') or []],
+            'filename_headers': {int(i): tuple(v) for i, v in index['filename_headers'].items()},
+            'texture_headers': {int(i): tuple(v) for i, v in index['texture_headers'].items()},
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_index(filename, records, platform, filename_headers, texture_headers, warnings=(), recovered=None):
+    """Write the sidecar index next to the archive. Returns False if it could not be written.
+
+    recovered is the archive's list of skipped ranges, or None if it was walked without recovery.
+    """
+    path = index_path(filename)
+    tmp_path = path + '.tmp'
+    index = {
+        'version': INDEX_VERSION,
+        'key': archive_key(filename),
+        'platform': platform,
+        'records': [value for record in records for value in record],
+        'warnings': list(warnings),
+        'recovered': None if recovered is None else [list(skipped) for skipped in recovered],
+        'filename_headers': {str(i): list(v) for i, v in filename_headers.items()},
+        'texture_headers': {str(i): list(v) for i, v in texture_headers.items()},
+    }
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def remove_index(filename):
+    try:
+        os.remove(index_path(filename))
+    except OSError:
+        pass
@@ -0,0 +1,363 @@
+# hunkfile_reader.py
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+import numpy as np
+import record_types
+
+RECORD_HEADER = struct.Struct('<II')
+READ_BUFFER_SIZE = 64 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024 * 1024
+RESYNC_CHUNK_SIZE = 4 * 1024 * 1024
+# payloads above this many bytes are memory mapped instead of read into RAM; see read_payload
+MAX_PAYLOAD_SIZE = 256 * 1024 * 1024
+
+# the record types resync_offset accepts as the start of a record
+KNOWN_RECORD_TYPES = np.array(sorted({
+    value for name, value in vars(record_types).items() if name.isupper() and isinstance(value, int)
+}), dtype=np.uint32)
+# cheap per-byte first cut for resync_offset, worked out from whichever record_types table is loaded
+_TYPE_TOP_BYTES = np.unique(KNOWN_RECORD_TYPES >> 24).astype(np.uint8)
+_TYPE_THIRD_BYTE_NONZERO = bool(((KNOWN_RECORD_TYPES >> 16) & 0xFF).all())
+
+# first bytes of a HUNKFILE_HEADER payload in PC archives (the last one is Scooby-Doo's); anything else is Wii
+PC_HUNKFILE_MAGICS = (b'\x01\x00\x01\x00\x01', b'\xE5\x0A\x01\x00\x01', b'\x01\x04\x01\x00\x01')
+
+# offset is where the payload starts, i.e. just past the 8-byte record header
+HunkRecord = namedtuple('HunkRecord', ['offset', 'size', 'type'])
+
+
+def header_platform(record, read_at):
+    """Platform named by a Hunkfile header record, or None for any other record.
+
+    read_at(offset, length) reads from the record's archive.
+    """
+    if record.type == record_types.HUNKFILE_HEADER and record.size >= 5:
+        return "PC" if bytes(read_at(record.offset, 5)) in PC_HUNKFILE_MAGICS else "Wii"
+    return None
+
+
+def parse_filename_header(data):
+    """Return (folder, filename) from a FILENAME_HEADER payload."""
+    try:
+        values = struct.unpack('<hhhhh', data[:10])
+        folder_length = values[3]
+        filename_length = values[4]
+        folder_offset = 10
+        filename_offset = 10 + folder_length
+        folder = bytes(data[folder_offset : folder_offset + folder_length]).decode('utf-8', errors='ignore').rstrip('\x00')
+        filename = bytes(data[filename_offset : filename_offset + filename_length]).decode('utf-8', errors='ignore').rstrip('\x00')
+        return folder, filename
+    except (struct.error, IndexError):
+        return "ErrorParsing", "ErrorParsing"
+
+
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def read_range(fp, offset, length):
+    """Read up to length bytes at offset of the binary file fp, leaving its position alone where pread exists."""
+    if not hasattr(os, 'pread'):
+        fp.seek(offset)
+        return fp.read(length)
+    chunks = []
+    while length > 0:
+        chunk = os.pread(fp.fileno(), length, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+        length -= len(chunk)
+    return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+
+def copy_range(src, dst, offset, length):
+    """Copy length bytes at offset of binary file src to the current position of binary file dst.
+
+    The bytes stay in the kernel through os.copy_file_range or os.sendfile where the
+    platform allows it; otherwise they go through a buffer of READ_BUFFER_SIZE. src's
+    file position is left alone. Returns the number of bytes copied, which is less than
+    length only if src ends first.
+    """
+    dst.flush()
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    copied = 0
+    kernel_copies = [
+        method for name, method in (('copy_file_range', _copy_file_range), ('sendfile', _sendfile))
+        if hasattr(os, name)
+    ]
+    for method in kernel_copies:
+        try:
+            while copied < length:
+                count = method(src_fd, dst_fd, offset + copied, min(length - copied, COPY_CHUNK_SIZE))
+                if count == 0:
+                    break
+                copied += count
+            break
+        except OSError:
+            continue  # not supported for this pair of files; carry on with the next method
+    else:
+        while copied < length:
+            count = min(length - copied, READ_BUFFER_SIZE)
+            if hasattr(os, 'pread'):
+                chunk = os.pread(src_fd, count, offset + copied)
+            else:
+                src.seek(offset + copied)
+                chunk = src.read(count)
+            if not chunk:
+                break
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(dst_fd, view):]
+            copied += len(chunk)
+    # the writes bypassed dst's buffer, so resync its idea of the position
+    dst.seek(os.lseek(dst_fd, 0, os.SEEK_CUR))
+    return copied
+
+
+def _plausible_header(fp, offset, file_size):
+    """Whether a record at offset fits in the file and is followed by the end of the file
+    or by another header that fits too."""
+    fp.seek(offset)
+    record_size, _record_type = RECORD_HEADER.unpack(fp.read(RECORD_HEADER.size))
+    end = offset + RECORD_HEADER.size + record_size
+    if end == file_size:
+        return True
+    if end + RECORD_HEADER.size > file_size:
+        return False
+    fp.seek(end)
+    next_size, _next_type = RECORD_HEADER.unpack(fp.read(RECORD_HEADER.size))
+    return end + RECORD_HEADER.size + next_size <= file_size
+
+
+def resync_offset(fp, start, file_size):
+    """Offset of the first plausible record header at or after start, or None.
+
+    A header is plausible when its type is one of KNOWN_RECORD_TYPES and the sizes of it
+    and the record after it stay inside the file. The file is scanned in chunks of
+    RESYNC_CHUNK_SIZE with NumPy rather than byte by byte.
+    """
+    chunk_start = start
+    while chunk_start + RECORD_HEADER.size <= file_size:
+        fp.seek(chunk_start)
+        # headers starting near the end of the chunk have their type in the next one
+        data = np.frombuffer(fp.read(RESYNC_CHUNK_SIZE + RECORD_HEADER.size - 1), dtype=np.uint8)
+        types = data[4:]
+        if len(types) < 4:
+            return None
+        # rule out most offsets by the type's top byte (and its third byte, when no known
+        # type has a zero there) before comparing whole words
+        if len(_TYPE_TOP_BYTES) == 1:
+            candidates = types[3:] == _TYPE_TOP_BYTES[0]
+        else:
+            candidates = np.isin(types[3:], _TYPE_TOP_BYTES)
+        if _TYPE_THIRD_BYTE_NONZERO:
+            candidates &= types[2:-1] != 0
+        hits = np.flatnonzero(candidates)
+        hits = hits[hits < RESYNC_CHUNK_SIZE]
+        words = (types[hits].astype(np.uint32) | (types[hits + 1].astype(np.uint32) << 8)
+                 | (types[hits + 2].astype(np.uint32) << 16) | (types[hits + 3].astype(np.uint32) << 24))
+        for hit in hits[np.isin(words, KNOWN_RECORD_TYPES)]:
+            if _plausible_header(fp, chunk_start + int(hit), file_size):
+                return chunk_start + int(hit)
+        chunk_start += RESYNC_CHUNK_SIZE
+    return None
+
+
+def map_range(fp, offset, length):
+    """Read-only memoryview of length bytes at offset of the binary file fp, backed by a memory map.
+
+    The OS pages the bytes in as they are touched and can drop them again, so a huge
+    payload never needs a buffer of its own. The map lives as long as the view.
+    """
+    start = offset - offset % mmap.ALLOCATIONGRANULARITY
+    mapped = mmap.mmap(fp.fileno(), offset + length - start, access=mmap.ACCESS_READ, offset=start)
+    return memoryview(mapped)[offset - start:]
+
+
+def read_payload(fp, offset, length, max_payload_size=None):
+    """length bytes at offset of fp: read into memory up to max_payload_size bytes
+    (MAX_PAYLOAD_SIZE if None), mapped (see map_range) above that.
+
+    The range is checked against the file's size first, so a bogus length raises
+    ValueError instead of allocating.
+    """
+    file_size = os.fstat(fp.fileno()).st_size
+    if offset < 0 or length < 0 or offset + length > file_size:
+        raise ValueError(f"Range of {length} bytes at 0x{offset:X} runs past the end of the {file_size} byte archive.")
+    if length > (MAX_PAYLOAD_SIZE if max_payload_size is None else max_payload_size):
+        return map_range(fp, offset, length)
+    fp.seek(offset)
+    return fp.read(length)
+
+
+def _open_source(source):
+    if isinstance(source, (str, bytes, os.PathLike)):
+        return open(source, 'rb'), True
+    return source, False
+
+
+def _walk(fp, buffer_size, warnings, with_payload, recovered=None, max_payload_size=None):
+    if max_payload_size is None:
+        max_payload_size = MAX_PAYLOAD_SIZE
+    fp.seek(0, os.SEEK_END)
+    file_size = fp.tell()
+    buf = b''
+    buf_start = 0
+    pos = 0
+    while pos < file_size:
+        if file_size - pos < RECORD_HEADER.size:
+            if warnings is not None:
+                warnings.append("Malformed HNK file: Unexpected EOF while reading record type.")
+            return
+        rel = pos - buf_start
+        if rel < 0 or rel + RECORD_HEADER.size > len(buf):
+            fp.seek(pos)
+            buf = fp.read(buffer_size)
+            buf_start = pos
+            rel = 0
+        record_size, record_type = RECORD_HEADER.unpack_from(buf, rel)
+        pos += RECORD_HEADER.size
+        available = file_size - pos
+        if record_size > available:
+            message = f"Malformed HNK file: Expected {record_size} bytes for record type 0x{record_type:X}, got {available}."
+            header_start = pos - RECORD_HEADER.size
+            resume = None if recovered is None else resync_offset(fp, header_start + 1, file_size)
+            if resume is None:
+                if warnings is not None:
+                    warnings.append(message)
+                return
+            recovered.append((header_start, resume))
+            if warnings is not None:
+                warnings.append(f"{message} Skipped bytes 0x{header_start:X}-0x{resume:X} and resumed at the next record.")
+            pos = resume
+            buf = b''
+            continue
+        record = HunkRecord(pos, record_size, record_type)
+        if not with_payload:
+            yield record
+        elif rel + RECORD_HEADER.size + record_size <= len(buf):
+            yield record, buf[rel + RECORD_HEADER.size : rel + RECORD_HEADER.size + record_size]
+        elif record_size > max_payload_size and hasattr(fp, 'fileno'):
+            yield record, map_range(fp, pos, record_size)
+        else:
+            fp.seek(pos)
+            yield record, fp.read(record_size)
+        pos += record_size
+
+
+def iter_records(source, buffer_size=READ_BUFFER_SIZE, warnings=None, recovered=None):
+    """Lazily yield a HunkRecord per record of source (a path or seekable binary file).
+
+    Only headers are read, through a buffer of at most buffer_size bytes. Problems with
+    the archive are appended to warnings (if given) and end the iteration, unless
+    recovered is a list: then a record whose size runs past the end of the file is
+    skipped up to the next plausible header (see resync_offset), and the skipped
+    (start, end) byte range is appended to recovered.
+    """
+    fp, owned = _open_source(source)
+    try:
+        yield from _walk(fp, buffer_size, warnings, False, recovered)
+    finally:
+        if owned:
+            fp.close()
+
+
+def iter_payloads(source, buffer_size=READ_BUFFER_SIZE, warnings=None, recovered=None, max_payload_size=None):
+    """Like iter_records, but yield (HunkRecord, payload) pairs.
+
+    A payload is bytes, or for records over max_payload_size (MAX_PAYLOAD_SIZE if None)
+    a memory mapped view (see map_range).
+    """
+    fp, owned = _open_source(source)
+    try:
+        yield from _walk(fp, buffer_size, warnings, True, recovered, max_payload_size)
+    finally:
+        if owned:
+            fp.close()
+
+
+class HunkfileReader:
+    """Record index of a .hnk archive. Payloads are only read when asked for."""
+
+    def __init__(self, filename, use_mmap=True, records=None, walk=True, recover=False,
+                 max_payload_size=None):
+        self.filename = filename
+        self.warnings = []
+        # unmapped readers map longer reads instead of reading them into RAM
+        self.max_payload_size = MAX_PAYLOAD_SIZE if max_payload_size is None else max_payload_size
+        # with recover, damaged stretches are skipped rather than ending the walk; see iter_records
+        self.recover = recover
+        self.recovered = []
+        self._fp = open(filename, 'rb')
+        self._lock = threading.Lock()
+        self.file_size = os.fstat(self._fp.fileno()).st_size
+        self._map = None
+        self._view = None
+        if use_mmap and self.file_size:
+            self._map = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+        # records from a trusted index (see hunkfile_index) skip the header walk
+        self.records = [] if records is None else records
+        if records is None and walk:
+            for _record in self.walk():
+                pass
+
+    def walk(self):
+        """Walk the record headers, appending each to self.records as it is found."""
+        # own file handle, so read_at can run on another thread meanwhile
+        recovered = self.recovered if self.recover else None
+        for record in iter_records(self.filename, warnings=self.warnings, recovered=recovered):
+            self.records.append(record)
+            yield record
+
+    def read_at(self, offset, length):
+        """Return length bytes at offset; a memoryview over the map when mapped.
+
+        Reads running past the end of the archive raise ValueError before anything is
+        allocated, and unmapped reads over max_payload_size are mapped (see map_range).
+        """
+        if offset < 0 or length < 0 or offset + length > self.file_size:
+            raise ValueError(f"Range of {length} bytes at 0x{offset:X} runs past the end of the {self.file_size} byte archive.")
+        if self._view is not None:
+            return self._view[offset:offset + length]
+        if length > self.max_payload_size:
+            return map_range(self._fp, offset, length)
+        if hasattr(os, 'pread'):
+            return read_range(self._fp, offset, length)
+        with self._lock:
+            return read_range(self._fp, offset, length)
+
+    def load_payload(self, index):
+        record = self.records[index]
+        return self.read_at(record.offset, record.size)
+
+    def copy_to(self, offset, length, dst):
+        """Copy length bytes at offset into the binary file dst without loading them (see copy_range)."""
+        if hasattr(os, 'pread'):
+            return copy_range(self._fp, dst, offset, length)
+        with self._lock:
+            return copy_range(self._fp, dst, offset, length)
+
+    def close(self):
+        self.records = []
+        if self._view is not None:
+            self._view.release()
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # caller still holds payload views; the map is freed along with them
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,12 +2,69 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
-import struct
 import os
-from PIL import Image, ImageTk
+import queue
+import threading
+from PIL import Image
 from record_types import *
+from hunkfile_reader import HunkfileReader, header_platform, parse_filename_header
+from hunkfile_writer import write_hunkfile
+from hunkfile_index import load_index, save_index
 from PC.pc_texture_decoder import PCTextureDecoder
 from Wii.wii_texture_decoder import WiiTextureDecoder
+from PC.pc_texture_encoder import PCTextureEncoder
+from Wii.wii_texture_encoder import WiiTextureEncoder
+from virtual_tree import VirtualTreeview
+from texture_cache import TextureCache, DiskTextureCache, DEFAULT_BUDGET_MB
+from texture_prefetch import TexturePrefetcher, DEFAULT_PREFETCH_RADIUS
+from texture_canvas import TextureCanvas, TexturePyramid
+from extract_records import RecordJob, named_records, record_output, extract_jobs
+
+LOAD_BATCH_SIZE = 500
+LOAD_POLL_MS = 30
+LOAD_BATCHES_PER_POLL = 4
+# context menu entries that work on the whole archive, so are disabled while it is still loading
+BULK_MENU_LABELS = ("Extract all records of this type...", "Extract all records...", "Save all textures as DDS...")
+
+RECORD_TYPE_NAMES = {
+    HUNKFILE_HEADER: "Hunkfile Header",
+    FILENAME_HEADER: "Filename Header",
+    EMPTY: "Empty",
+    ABSTRACT_HASH_IDENTIFIER: "Abstract Hash Identifier",
+    TSE_STRING_TABLE_MAIN: "TSE String Table Main",
+    CLANK_BODY_TEMPLATE_MAIN: "Clank Body Template Main",
+    CLANK_BODY_TEMPLATE_SECONDARY: "Clank Body Template Secondary",
+    CLANK_BODY_TEMPLATE_NAME: "Clank Body Template Name",
+    CLANK_BODY_TEMPLATE_DATA: "Clank Body Template Data",
+    CLANK_BODY_TEMPLATE_DATA_2: "Clank Body Template Data 2",
+    LITE_SCRIPT_MAIN: "Lite Script Main",
+    LITE_SCRIPT_DATA: "Lite Script Data",
+    LITE_SCRIPT_DATA_2: "Lite Script Data 2",
+    SQUEAK_SAMPLE_DATA: "Squeak Sample Data",
+    TSE_TEXTURE_HEADER: "TSE Texture Header",
+    TSE_TEXTURE_DATA: "TSE Texture Data",
+    TSE_TEXTURE_DATA_2: "TSE Texture Data 2",
+    RENDER_MODEL_TEMPLATE_HEADER: "Render Model Template Header",
+    RENDER_MODEL_TEMPLATE_DATA: "Render Model Template Data",
+    RENDER_MODEL_TEMPLATE_DATA_TABLE: "Render Model Template Data Table",
+    ANIMATION_DATA: "Animation Data",
+    ANIMATION_DATA_2: "Animation Data 2",
+    RENDER_SPRITE_DATA: "Render Sprite Data",
+    EFFECTS_PARAMS_DATA: "Effects Params Data",
+    TSE_FONT_DESCRIPTOR_DATA: "TSE Font Descriptor Data",
+    TSE_DATA_TABLE_DATA_1: "TSE Data Table Data 1",
+    TSE_DATA_TABLE_DATA_2: "TSE Data Table Data 2",
+    STATE_FLOW_TEMPLATE_DATA: "State Flow Template Data",
+    STATE_FLOW_TEMPLATE_DATA_2: "State Flow Template Data 2",
+    SQUEAK_STREAM_DATA: "Squeak Stream Data",
+    SQUEAK_STREAM_DATA_2: "Squeak Stream Data 2",
+    ENTITY_PLACEMENT_DATA: "Entity Placement Data",
+    ENTITY_PLACEMENT_DATA_2: "Entity Placement Data 2",
+    ENTITY_PLACEMENT_BCC_DATA: "Entity Placement BCC Data",
+    ENTITY_PLACEMENT_LEVEL_DATA: "Entity Placement Level Data",
+    ENTITY_TEMPLATE_DATA: "Entity Template Data",
+    TSE_TEXTURE_DATA_WII: "TSE Texture Data (Wii)"
+}
 
 class HunkfileViewer:
     def __init__(self, root):
@@ -15,9 +72,28 @@ class HunkfileViewer:
         self.root.title("Hunkfile Viewer")
         self.records = []
         self.current_file = None
-        self.texture_image = None
+        self.archive = None
         self.textures = {}
+        self.texture_by_record = {}
+        self.use_mmap = True
+        self.use_index_cache = True
+        self.virtual_list = True
+        self.virtual_tree = None
+        self.shown_record_index = None
+        self.index_platform = None
+        self.filename_headers = {}
+        self.texture_headers = {}
+        self.archive_id = None
+        self.texture_cache = TextureCache(DEFAULT_BUDGET_MB)
+        self.disk_cache = None
+        self.prefetcher = TexturePrefetcher()
+        self.prefetch_radius = DEFAULT_PREFETCH_RADIUS
+        self.last_texture_number = None
         self.texture_decoder = None
+        self.pending_texture_id = None
+        self.load_thread = None
+        self.load_queue = None
+        self.load_cancel = None
         self.platform_label = None
         self.create_widgets()
         self.setup_context_menu()
@@ -25,6 +101,11 @@ class HunkfileViewer:
     def setup_context_menu(self):
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="Extract to .dat file", command=self.extract_selected_record)
+        self.context_menu.add_command(label=BULK_MENU_LABELS[0], command=lambda: self.extract_all_records(True))
+        self.context_menu.add_command(label=BULK_MENU_LABELS[1], command=self.extract_all_records)
+        self.context_menu.add_command(label="Save as DDS", command=self.save_selected_dds)
+        self.context_menu.add_command(label=BULK_MENU_LABELS[2], command=self.save_all_dds)
+        self.context_menu.add_command(label="Replace texture...", command=self.replace_selected_texture)
         self.tree.bind("<Button-3>", self.show_context_menu)
 
     def show_context_menu(self, event):
@@ -33,19 +114,23 @@ class HunkfileViewer:
             self.tree.selection_set(item)
             self.context_menu.post(event.x_root, event.y_root)
 
+    def set_bulk_actions(self, state):
+        for label in BULK_MENU_LABELS:
+            self.context_menu.entryconfigure(label, state=state)
+
     def extract_selected_record(self):
         selection = self.tree.selection()
         if not selection:
             return
         try:
             record_index = int(selection[0])
-            _record_size, record_type, record_data, record_pos = self.records[record_index]
+            record = self.records[record_index]
         except (ValueError, IndexError):
             messagebox.showerror("Error", "Could not retrieve record data for extraction.")
             return
-        default_filename = f"record_0x{record_type:08X}_at_{record_pos}.dat"
-        if record_type == FILENAME_HEADER:
-            folder, filename = self.parse_filename_header(record_data)
+        default_filename = f"record_0x{record.type:08X}_at_{record.offset}.dat"
+        if record.type == FILENAME_HEADER:
+            folder, filename = self.get_filename_header(record_index)
             if filename and filename != "ErrorParsing":
                 default_filename = filename + ".dat"
         output_path = filedialog.asksaveasfilename(
@@ -58,11 +143,167 @@ class HunkfileViewer:
             return
         try:
             with open(output_path, 'wb') as f:
-                f.write(record_data)
+                if self.archive.copy_to(record.offset, record.size, f) != record.size:
+                    raise IOError("Unexpected end of archive while copying record data.")
             messagebox.showinfo("Success", f"Record data successfully extracted to:\n{output_path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save record data:\n{str(e)}")
 
+    def extract_all_records(self, same_type=False):
+        """Copy every record (or every record of the selected record's type) to its own .dat file."""
+        if self.archive is None:
+            return
+        types = None
+        if same_type:
+            selection = self.tree.selection()
+            if not selection:
+                return
+            try:
+                types = {self.records[int(selection[0])].type}
+            except (ValueError, IndexError):
+                messagebox.showerror("Error", "Could not retrieve record data for extraction.")
+                return
+        output_dir = filedialog.askdirectory(title="Extract Records")
+        if not output_dir:
+            return
+        jobs = [
+            RecordJob(self.archive.filename, index, record, record_output(output_dir, index, record, name))
+            for index, record, name in named_records(list(self.records), self.archive.read_at, types)
+        ]
+        saved = 0
+        errors = []
+        for job, error in extract_jobs(jobs):
+            if error is None:
+                saved += 1
+            else:
+                errors.append(f"{job.number}: {error}")
+        if errors:
+            messagebox.showwarning("Warning", f"Extracted {saved} records, {len(errors)} failed:\n" + "\n".join(errors[:10]))
+        else:
+            messagebox.showinfo("Success", f"Extracted {saved} records to:\n{output_dir}")
+
+    def write_dds(self, tex_meta, output_path):
+        """Write a texture as DDS: a synthesized header, then the payload copied straight from the archive."""
+        data_record = self.records[tex_meta['data_index']]
+        header, length = self.texture_decoder.dds_file_header(
+            tex_meta['width'], tex_meta['height'], tex_meta['format'], data_record.size
+        )
+        with open(output_path, 'wb') as f:
+            f.write(header)
+            if self.archive.copy_to(data_record.offset, length, f) != length:
+                raise IOError("Unexpected end of archive while copying texture data.")
+
+    def dds_textures(self):
+        """Yield (tex_id, metadata) of every texture that has data and a known size."""
+        for tex_id, tex_meta in list(self.textures.items()):
+            if tex_meta['data_index'] is None:
+                continue
+            tex_meta = self.texture_info(tex_id)
+            if tex_meta['width'] > 0 and tex_meta['height'] > 0:
+                yield tex_id, tex_meta
+
+    def save_selected_dds(self):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        if not isinstance(self.texture_decoder, PCTextureDecoder):
+            messagebox.showerror("Error", "DDS export is only available for PC textures.")
+            return
+        try:
+            tex_id = self.texture_by_record.get(int(selection[0]))
+        except ValueError:
+            tex_id = None
+        if tex_id is None or self.textures[tex_id]['data_index'] is None:
+            messagebox.showerror("Error", "The selected record has no associated texture data.")
+            return
+        tex_meta = self.texture_info(tex_id)
+        output_path = filedialog.asksaveasfilename(
+            title="Save Texture as DDS",
+            initialfile=f"{tex_id}.dds",
+            defaultextension=".dds",
+            filetypes=(("DDS files", "*.dds"), ("All files", "*.*"))
+        )
+        if not output_path:
+            return
+        try:
+            self.write_dds(tex_meta, output_path)
+            messagebox.showinfo("Success", f"Texture successfully saved to:\n{output_path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save texture:\n{str(e)}")
+
+    def save_all_dds(self):
+        if not isinstance(self.texture_decoder, PCTextureDecoder):
+            messagebox.showerror("Error", "DDS export is only available for PC textures.")
+            return
+        output_dir = filedialog.askdirectory(title="Save All Textures as DDS")
+        if not output_dir:
+            return
+        saved = 0
+        errors = []
+        for tex_id, tex_meta in self.dds_textures():
+            try:
+                self.write_dds(tex_meta, os.path.join(output_dir, f"{tex_id}.dds"))
+                saved += 1
+            except Exception as e:
+                errors.append(f"{tex_id}: {str(e)}")
+        if errors:
+            messagebox.showwarning("Warning", f"Saved {saved} textures, {len(errors)} failed:\n" + "\n".join(errors[:10]))
+        else:
+            messagebox.showinfo("Success", f"Saved {saved} textures to:\n{output_dir}")
+
+    def encode_texture_payload(self, image_path, tex_meta):
+        """Encode an image file as a replacement for a texture's data record, keeping its size and mip count."""
+        record = self.records[tex_meta['data_index']]
+        width, height, texture_format = tex_meta['width'], tex_meta['height'], tex_meta['format']
+        with Image.open(image_path) as image:
+            image = image.convert("RGBA")
+        if image.size != (width, height):
+            raise ValueError(f"The image is {image.width}x{image.height}, the texture {width}x{height}.")
+        layout = self.texture_decoder.mip_layout(width, height, texture_format, record.size)
+        encoder = PCTextureEncoder() if isinstance(self.texture_decoder, PCTextureDecoder) else WiiTextureEncoder()
+        data = encoder.encode_texture(image, texture_format, len(layout))
+        # whatever follows the mip chain (padding, a palette) is kept as it was
+        _width, _height, last_offset, last_size = layout[-1]
+        chain_end = min(record.size, last_offset + last_size)
+        return data + bytes(self.archive.read_at(record.offset + chain_end, record.size - chain_end))
+
+    def replace_selected_texture(self):
+        """Encode an image over the selected texture and save the result as a new archive."""
+        selection = self.tree.selection()
+        if not selection or self.archive is None:
+            return
+        try:
+            tex_id = self.texture_by_record.get(int(selection[0]))
+        except ValueError:
+            tex_id = None
+        if tex_id is None or self.textures[tex_id]['data_index'] is None:
+            messagebox.showerror("Error", "The selected record has no associated texture data.")
+            return
+        tex_meta = self.texture_info(tex_id)
+        image_path = filedialog.askopenfilename(
+            title="Replace Texture",
+            filetypes=(("Image files", "*.png *.tga *.bmp *.dds *.jpg"), ("All files", "*.*"))
+        )
+        if not image_path:
+            return
+        output_path = filedialog.asksaveasfilename(
+            title="Save Modified Archive",
+            initialfile=os.path.basename(self.archive.filename),
+            defaultextension=os.path.splitext(self.archive.filename)[1],
+            filetypes=(("HNK files", "*.hnk"), ("All files", "*.*"))
+        )
+        if not output_path:
+            return
+        if os.path.abspath(output_path) == os.path.abspath(self.archive.filename):
+            messagebox.showerror("Error", "Save the modified archive under a new name; the open one is still being read.")
+            return
+        try:
+            payload = self.encode_texture_payload(image_path, tex_meta)
+            write_hunkfile(self.archive.filename, output_path, {tex_meta['data_index']: payload}, self.records)
+            messagebox.showinfo("Success", f"Modified archive saved to:\n{output_path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to replace texture:\n{str(e)}")
+
     def create_widgets(self):
         self.platform_label = tk.Label(
             self.root,
@@ -74,6 +315,25 @@ class HunkfileViewer:
             pady=5
         )
         self.platform_label.pack(fill=tk.X, padx=5, pady=2)
+        status_frame = tk.Frame(self.root, relief=tk.SUNKEN, bd=1)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_label = tk.Label(status_frame, text=self.texture_cache.stats_text(), anchor="w")
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.cache_budget = tk.IntVar(value=DEFAULT_BUDGET_MB)
+        tk.Spinbox(
+            status_frame, from_=16, to=16384, increment=64, width=6,
+            textvariable=self.cache_budget, command=self.update_cache_budget
+        ).pack(side=tk.RIGHT, padx=5)
+        tk.Label(status_frame, text="Cache budget (MB):").pack(side=tk.RIGHT)
+        self.disk_cache_enabled = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            status_frame, text="Disk cache", variable=self.disk_cache_enabled,
+            command=self.toggle_disk_cache
+        ).pack(side=tk.RIGHT, padx=5)
+        self.recover_enabled = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            status_frame, text="Recover damaged archives", variable=self.recover_enabled
+        ).pack(side=tk.RIGHT, padx=5)
         main_panel = tk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         main_panel.pack(fill=tk.BOTH, expand=True)
         left_panel = tk.Frame(main_panel, width=300)
@@ -84,11 +344,17 @@ class HunkfileViewer:
         button_frame.pack(fill=tk.X, padx=5, pady=5)
         open_button = tk.Button(button_frame, text="Open HNK File", command=self.open_file)
         open_button.pack(side=tk.LEFT, expand=True)
-        self.tree = ttk.Treeview(left_panel, columns=("Type", "Size", "Details"), show="headings")
+        self.load_progress = ttk.Progressbar(button_frame, orient=tk.HORIZONTAL, mode='determinate', maximum=1.0)
+        self.cancel_button = tk.Button(button_frame, text="Cancel", command=self.cancel_loading)
+        tree_frame = tk.Frame(left_panel)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.tree = ttk.Treeview(tree_frame, columns=("Type", "Size", "Details"), show="headings")
         self.tree.heading("Type", text="Record Type")
         self.tree.heading("Size", text="Record Size")
         self.tree.heading("Details", text="Details")
-        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.tree_scrollbar = tk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+        self.tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         details_frame = tk.Frame(right_panel)
         right_panel.add(details_frame)
         self.details = ScrolledText(details_frame, height=10)
@@ -97,21 +363,29 @@ class HunkfileViewer:
         right_panel.add(self.texture_frame)
         self.canvas = tk.Canvas(self.texture_frame, bg='white')
         self.canvas.pack(fill=tk.BOTH, expand=True)
-        self.scrollbar_y = tk.Scrollbar(self.texture_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.scrollbar_y = tk.Scrollbar(self.texture_frame, orient=tk.VERTICAL)
         self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-        self.scrollbar_x = tk.Scrollbar(self.texture_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.scrollbar_x = tk.Scrollbar(self.texture_frame, orient=tk.HORIZONTAL)
         self.scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
-        self.canvas.configure(yscrollcommand=self.scrollbar_y.set, xscrollcommand=self.scrollbar_x.set)
-        self.canvas.bind('<Configure>', lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        # zoom/pan view; only the tiles in sight become PhotoImages
+        self.texture_view = TextureCanvas(self.canvas, self.scrollbar_x, self.scrollbar_y)
         self.tree.bind("<<TreeviewSelect>>", self.show_details)
+        if self.virtual_list:
+            # rows are materialized from self.records only while they are on screen
+            self.virtual_tree = VirtualTreeview(self.tree, self.tree_scrollbar, self.record_row)
+        else:
+            self.tree_scrollbar.configure(command=self.tree.yview)
+            self.tree.configure(yscrollcommand=self.tree_scrollbar.set)
+
+    def header_platform(self, record):
+        """Platform named by a Hunkfile header record, or None for any other record."""
+        return header_platform(record, self.archive.read_at)
 
     def detect_platform(self, records):
-        for record_size, record_type, record_data, _ in records:
-            if record_type == HUNKFILE_HEADER and len(record_data) >= 5:
-                if record_data[:5] in (b'\x01\x00\x01\x00\x01', b'\xE5\x0A\x01\x00\x01'):
-                    return "PC"
-                else:
-                    return "Wii"
+        for record in records:
+            platform = self.header_platform(record)
+            if platform:
+                return platform
         return "Wii"  # Default to Wii if no Hunk header is found
 
     def open_file(self):
@@ -121,163 +395,419 @@ class HunkfileViewer:
         )
         if not file_path:
             return
+        self.cancel_loading()
         self.current_file = file_path
         self.root.title(f"Hunkfile Viewer - {os.path.basename(file_path)}")
+        self.clear_views()
         try:
-            parsed_records = self.read_hunkfile(file_path)
-            platform = self.detect_platform(parsed_records)
-            self.platform_label.config(text=f"Platform: {platform}")
-            self.texture_decoder = PCTextureDecoder() if platform == "PC" else WiiTextureDecoder()
-            self.populate_tree(parsed_records)
+            cached = self.open_archive(file_path)
         except Exception as e:
             self.platform_label.config(text="Platform: Error")
             messagebox.showerror("Error", f"Failed to read or parse HNK file:\n{str(e)}")
+            return
+        self.platform_label.config(text="Platform: Loading...")
+        self.load_queue = queue.Queue()
+        self.load_cancel = threading.Event()
+        self.load_thread = threading.Thread(
+            target=self.load_worker,
+            args=(cached, self.load_queue, self.load_cancel),
+            daemon=True
+        )
+        self.load_progress['value'] = 0
+        self.load_progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.cancel_button.pack(side=tk.LEFT)
+        # the loader is still adding records and textures
+        self.set_bulk_actions(tk.DISABLED)
+        self.load_thread.start()
+        self.root.after(LOAD_POLL_MS, self.poll_loading, self.load_queue)
+
+    def open_archive(self, filename):
+        """Open filename as self.archive without walking it. Returns the cached index, if any."""
+        if self.archive is not None:
+            self.records = []
+            self.textures.clear()
+            self.texture_by_record.clear()
+            self.archive.close()
+            self.archive = None
+        self.index_platform = None
+        self.filename_headers = {}
+        self.texture_headers = {}
+        st = os.stat(filename)
+        self.archive_id = (os.path.abspath(filename), st.st_size, st.st_mtime_ns)
+        recover = bool(self.recover_enabled.get())
+        cached = load_index(filename, recover) if self.use_index_cache else None
+        if cached is not None:
+            self.archive = HunkfileReader(filename, use_mmap=self.use_mmap, records=cached['records'], recover=recover)
+            self.archive.warnings = cached['warnings']
+            self.archive.recovered = cached['recovered']
+            self.index_platform = cached['platform']
+            self.filename_headers = cached['filename_headers']
+            self.texture_headers = cached['texture_headers']
+        else:
+            self.archive = HunkfileReader(filename, use_mmap=self.use_mmap, walk=False, recover=recover)
+        self.records = self.archive.records
+        return cached
 
     def read_hunkfile(self, filename):
-        records = []
-        with open(filename, 'rb') as fp:
-            while True:
-                record_size_bytes = fp.read(4)
-                if not record_size_bytes:
-                    break
-                record_type_bytes = fp.read(4)
-                if not record_type_bytes:
-                    messagebox.showwarning("Warning", "Malformed HNK file: Unexpected EOF while reading record type.")
-                    break
-                record_size = struct.unpack('<I', record_size_bytes)[0]
-                record_type = struct.unpack('<I', record_type_bytes)[0]
-                data = fp.read(record_size)
-                if len(data) < record_size:
-                    messagebox.showwarning("Warning", f"Malformed HNK file: Expected {record_size} bytes for record type 0x{record_type:X}, got {len(data)}.")
-                    break
-                records.append((record_size, record_type, data, fp.tell()))
-        return records
+        if self.open_archive(filename) is None:
+            for _record in self.archive.walk():
+                pass
+        self.show_archive_warnings()
+        return self.archive.records
+
+    def show_archive_warnings(self):
+        """Report the archive's warnings in one dialog rather than one per warning."""
+        warnings = self.archive.warnings
+        if not warnings:
+            return
+        text = "\n".join(warnings[:10])
+        if len(warnings) > 10:
+            text += f"\n... and {len(warnings) - 10} more"
+        if self.archive.recovered:
+            skipped = sum(end - start for start, end in self.archive.recovered)
+            text = f"Recovered from {len(self.archive.recovered)} damaged ranges ({skipped} bytes skipped):\n" + text
+        messagebox.showwarning("Warning", text)
+
+    def load_worker(self, cached, load_queue, cancel):
+        """Walk and describe the records off the Tk thread, queueing rows in batches."""
+        try:
+            records = cached['records'] if cached else self.archive.walk()
+            platform = cached['platform'] if cached else None
+            if platform is not None:
+                self.set_platform(platform)
+                load_queue.put(('platform', platform))
+            file_size = self.archive.file_size or 1
+            waiting = []
+            batch = []
+            batch_start = index = 0
+            for record in records:
+                if cancel.is_set():
+                    load_queue.put(('cancelled', None))
+                    return
+                if platform is None:
+                    # rows wait until the Hunkfile header tells us which decoder to use
+                    waiting.append(record)
+                    platform = self.header_platform(record)
+                    if platform is None:
+                        continue
+                    self.set_platform(platform)
+                    load_queue.put(('platform', platform))
+                    ready, waiting = waiting, []
+                else:
+                    ready = [record]
+                for ready_record in ready:
+                    self.queue_row(batch, index, ready_record)
+                    index += 1
+                if index - batch_start >= LOAD_BATCH_SIZE:
+                    load_queue.put(('rows', (batch, index, (record.offset + record.size) / file_size)))
+                    batch = []
+                    batch_start = index
+            if platform is None:
+                platform = "Wii"  # Default to Wii if no Hunk header is found
+                self.set_platform(platform)
+                load_queue.put(('platform', platform))
+                for waiting_record in waiting:
+                    self.queue_row(batch, index, waiting_record)
+                    index += 1
+            load_queue.put(('rows', (batch, index, 1.0)))
+            load_queue.put(('done', platform))
+        except Exception as e:
+            load_queue.put(('error', e))
+
+    def queue_row(self, batch, index, record):
+        row = self.describe_record(index, record)
+        if row is not None:
+            batch.append(row)
+
+    def poll_loading(self, load_queue):
+        if load_queue is not self.load_queue:
+            return  # a newer file was opened
+        inserted = 0
+        while inserted < LOAD_BATCHES_PER_POLL:
+            try:
+                kind, payload = load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'platform':
+                self.platform_label.config(text=f"Platform: {payload}")
+            elif kind == 'rows':
+                rows, count, progress = payload
+                if self.virtual_tree is not None:
+                    self.virtual_tree.set_count(count)
+                else:
+                    self.insert_rows(rows)
+                    inserted += 1
+                self.load_progress['value'] = progress
+            else:
+                self.finish_loading(kind, payload)
+                return
+        self.root.after(LOAD_POLL_MS, self.poll_loading, load_queue)
+
+    def finish_loading(self, kind, payload):
+        self.load_progress.pack_forget()
+        self.cancel_button.pack_forget()
+        self.load_queue = None
+        self.set_bulk_actions(tk.NORMAL)
+        if kind == 'done':
+            self.show_archive_warnings()
+            if self.use_index_cache and self.index_platform is None:
+                save_index(self.current_file, self.records, payload, self.filename_headers,
+                           self.texture_headers, self.archive.warnings,
+                           self.archive.recovered if self.archive.recover else None)
+        elif kind == 'cancelled':
+            self.platform_label.config(text=self.platform_label.cget("text") + " (loading cancelled)")
+        else:
+            self.platform_label.config(text="Platform: Error")
+            messagebox.showerror("Error", f"Failed to read or parse HNK file:\n{str(payload)}")
+
+    def cancel_loading(self):
+        if self.load_thread is not None and self.load_thread.is_alive():
+            self.load_cancel.set()
+            self.load_thread.join()
+        if self.load_queue is not None:
+            self.finish_loading('cancelled', None)
+
+    def set_platform(self, platform):
+        # large textures decode in bands on every core
+        threads = os.cpu_count() or 1
+        self.texture_decoder = PCTextureDecoder(threads=threads) if platform == "PC" else WiiTextureDecoder(threads=threads)
 
     def parse_filename_header(self, data):
+        return parse_filename_header(data)
+
+    def get_filename_header(self, record_index):
+        if record_index not in self.filename_headers:
+            self.filename_headers[record_index] = self.parse_filename_header(self.archive.load_payload(record_index))
+        return self.filename_headers[record_index]
+
+    def get_texture_header(self, record_index):
+        if record_index not in self.texture_headers:
+            self.texture_headers[record_index] = self.texture_decoder.parse_texture_header(self.archive.load_payload(record_index))
+        return self.texture_headers[record_index]
+
+    def update_cache_budget(self):
         try:
-            values = struct.unpack('<hhhhh', data[:10])
-            folder_length = values[3]
-            filename_length = values[4]
-            folder_offset = 10
-            filename_offset = 10 + folder_length
-            folder = data[folder_offset : folder_offset + folder_length].decode('utf-8', errors='ignore').rstrip('\x00')
-            filename = data[filename_offset : filename_offset + filename_length].decode('utf-8', errors='ignore').rstrip('\x00')
-            return folder, filename
-        except (struct.error, IndexError):
-            return "ErrorParsing", "ErrorParsing"
-
-    def show_texture(self, texture_data, width, height, texture_format):
-        self.canvas.delete("all")
+            self.texture_cache.set_budget(max(1, int(self.cache_budget.get())))
+        except (ValueError, tk.TclError):
+            return
+        self.update_status()
+
+    def toggle_disk_cache(self):
+        if not self.disk_cache_enabled.get():
+            self.disk_cache = None
+        else:
+            try:
+                self.disk_cache = DiskTextureCache()
+            except OSError as e:
+                self.disk_cache_enabled.set(False)
+                messagebox.showerror("Error", f"Could not open the texture disk cache:\n{str(e)}")
+        self.update_status()
+
+    def update_status(self):
+        text = self.texture_cache.stats_text()
+        if self.disk_cache is not None:
+            text += f" | Disk cache: {self.disk_cache.hits} hits / {self.disk_cache.misses} misses"
+        self.status_label.config(text=text)
+
+    def preview_size(self):
+        return self.texture_view.viewport()
+
+    def decode_level(self, decoder, levels, level, texture_format, cache_key=None, header_data=None, tlut=None):
+        """Decode one mip level to a PIL image, going through the caches.
+
+        tlut is the palette of paletted textures (see split_tlut). Touches no widgets,
+        so prefetch workers can call it.
+        """
+        level_width, level_height, level_data = levels[level]
+        decoded_key = ('decoded',) + cache_key + (level,) if cache_key is not None else None
+        decoded = self.texture_cache.get(decoded_key) if decoded_key is not None else None
+        if decoded is not None:
+            return decoded
+        disk_cache = self.disk_cache
+        if disk_cache is not None and header_data is not None:
+            pixels = disk_cache.decode(decoder, header_data, level_data,
+                                       level_width, level_height, texture_format, level, tlut)
+            decoded = None if pixels is None else Image.fromarray(pixels, "RGBA")
+        else:
+            decoded = decoder.decode_texture(level_data, level_width, level_height, texture_format, tlut)
+        if decoded is None:
+            raise ValueError("Failed to decode texture")
+        if decoded_key is not None:
+            self.texture_cache.put(decoded_key, decoded)
+        return decoded
+
+    def show_texture(self, texture_data, width, height, texture_format, cache_key=None, header_data=None):
+        """Preview a texture. cache_key (the data record offset) enables the decoded-image cache,
+        header_data the disk cache when it is switched on."""
+        self.texture_view.clear()
         if width == 0 or height == 0:
             self.canvas.create_text(50, 50, text="Invalid texture dimensions (0x0).", fill="orange")
             return False
-        format_text = f"Format: {texture_format} | Dimensions: {width}x{height}"
-        self.canvas.create_text(10, 10, text=format_text, anchor=tk.NW, fill="black")
         try:
-            img = self.texture_decoder.decode_texture(texture_data, width, height, texture_format)
-            if img is None:
-                raise ValueError("Failed to decode texture")
-            canvas_width = self.texture_frame.winfo_width() - 20
-            canvas_height = self.texture_frame.winfo_height() - 20
-            img_display_width, img_display_height = img.width, img.height
-            if img.width > canvas_width or img.height > canvas_height:
-                ratio = min(canvas_width / img.width, canvas_height / img.height)
-                if ratio > 0:
-                    img_display_width = int(img.width * ratio)
-                    img_display_height = int(img.height * ratio)
-                    if img_display_width > 0 and img_display_height > 0:
-                        img = img.resize((img_display_width, img_display_height), Image.Resampling.LANCZOS)
-            self.texture_image = ImageTk.PhotoImage(img)
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.texture_image)
-            self.canvas.config(scrollregion=self.canvas.bbox("all"))
+            if cache_key is not None:
+                cache_key = (self.archive_id, cache_key)
+            decoder = self.texture_decoder
+            texture_data, tlut = decoder.split_tlut(texture_data, width, height, texture_format)
+            levels = decoder.mip_levels(texture_data, width, height, texture_format)
+
+            def level_source(level):
+                # pyramid levels past the mip chain are downsampled from the finest one
+                if level >= len(levels):
+                    return None
+                return self.decode_level(decoder, levels, level, texture_format, cache_key, header_data, tlut)
+
+            pyramid = TexturePyramid(width, height, level_source)
+            # decode the smallest mip that fills the fitted view now, so a bad texture is reported here
+            level = decoder.select_mip_level(levels, *self.preview_size())
+            pyramid.set_level(level, level_source(level))
+            format_text = f"Format: {texture_format} | Dimensions: {width}x{height}"
+            if len(levels) > 1:
+                format_text += f" | {len(levels)} mip levels"
+            self.texture_view.show(pyramid, format_text)
+            self.update_status()
             return True
         except Exception as e:
+            self.texture_view.clear()
             error_message = f"Failed to display texture ({width}x{height}, {texture_format}):\n{str(e)}"
             self.canvas.create_text(10, 10, text=error_message, fill="red", anchor=tk.NW, width=self.canvas.winfo_width() - 20)
             return False
 
-    def populate_tree(self, parsed_records):
+    def prefetch_neighbours(self, tex_id):
+        """Decode the textures around tex_id in the background, nearest first and
+        favouring the direction the selection is moving in."""
+        if tex_id is None or self.prefetch_radius <= 0:
+            self.prefetcher.cancel()
+            return
+        number = int(tex_id.split('_')[1])
+        step = -1 if self.last_texture_number is not None and number < self.last_texture_number else 1
+        self.last_texture_number = number
+        canvas_width, canvas_height = self.preview_size()
+        jobs = []
+        for distance in range(1, self.prefetch_radius + 1):
+            for neighbour in (number + step * distance, number - step * distance):
+                job = self.prefetch_job(f"texture_{neighbour}", canvas_width, canvas_height)
+                if job is not None:
+                    jobs.append(job)
+        self.prefetcher.schedule(jobs)
+
+    def prefetch_job(self, tex_id, canvas_width, canvas_height):
+        """Return a (key, estimated_bytes, fn) prefetch job for tex_id, or None if there is nothing to decode."""
+        if tex_id not in self.textures or self.textures[tex_id]['data_index'] is None:
+            return None
+        try:
+            tex_meta = self.texture_info(tex_id)
+        except Exception:
+            return None
+        if tex_meta['width'] <= 0 or tex_meta['height'] <= 0:
+            return None
+        data_record = self.records[tex_meta['data_index']]
+        header_record = self.records[tex_meta['header_index']]
+        cache_key = (self.archive_id, data_record.offset)
+        # bind everything now; the archive or platform may change before the job runs
+        archive = self.archive
+        decoder = self.texture_decoder
+
+        def job():
+            texture_data, tlut = decoder.split_tlut(
+                archive.read_at(data_record.offset, data_record.size),
+                tex_meta['width'],
+                tex_meta['height'],
+                tex_meta['format']
+            )
+            levels = decoder.mip_levels(texture_data, tex_meta['width'], tex_meta['height'], tex_meta['format'])
+            self.decode_level(
+                decoder,
+                levels,
+                decoder.select_mip_level(levels, canvas_width, canvas_height),
+                tex_meta['format'],
+                cache_key,
+                archive.read_at(header_record.offset, header_record.size),
+                tlut
+            )
+
+        estimate = tex_meta['width'] * tex_meta['height'] * 4 + data_record.size
+        return cache_key + (canvas_width, canvas_height), estimate, job
+
+    def clear_views(self):
+        self.prefetcher.cancel()
+        self.last_texture_number = None
         self.tree.delete(*self.tree.get_children())
-        self.records = parsed_records
-        self.canvas.delete("all")
+        if self.virtual_tree is not None:
+            self.virtual_tree.reset()
+        self.texture_view.clear()
         self.details.delete(1.0, tk.END)
         self.textures.clear()
-        current_texture_id_awaiting_data = None
-
-        record_type_names = {
-            HUNKFILE_HEADER: "Hunkfile Header",
-            FILENAME_HEADER: "Filename Header",
-            EMPTY: "Empty",
-            ABSTRACT_HASH_IDENTIFIER: "Abstract Hash Identifier",
-            TSE_STRING_TABLE_MAIN: "TSE String Table Main",
-            CLANK_BODY_TEMPLATE_MAIN: "Clank Body Template Main",
-            CLANK_BODY_TEMPLATE_SECONDARY: "Clank Body Template Secondary",
-            CLANK_BODY_TEMPLATE_NAME: "Clank Body Template Name",
-            CLANK_BODY_TEMPLATE_DATA: "Clank Body Template Data",
-            CLANK_BODY_TEMPLATE_DATA_2: "Clank Body Template Data 2",
-            LITE_SCRIPT_MAIN: "Lite Script Main",
-            LITE_SCRIPT_DATA: "Lite Script Data",
-            LITE_SCRIPT_DATA_2: "Lite Script Data 2",
-            SQUEAK_SAMPLE_DATA: "Squeak Sample Data",
-            TSE_TEXTURE_HEADER: "TSE Texture Header",
-            TSE_TEXTURE_DATA: "TSE Texture Data",
-            TSE_TEXTURE_DATA_2: "TSE Texture Data 2",
-            RENDER_MODEL_TEMPLATE_HEADER: "Render Model Template Header",
-            RENDER_MODEL_TEMPLATE_DATA: "Render Model Template Data",
-            RENDER_MODEL_TEMPLATE_DATA_TABLE: "Render Model Template Data Table",
-            ANIMATION_DATA: "Animation Data",
-            ANIMATION_DATA_2: "Animation Data 2",
-            RENDER_SPRITE_DATA: "Render Sprite Data",
-            EFFECTS_PARAMS_DATA: "Effects Params Data",
-            TSE_FONT_DESCRIPTOR_DATA: "TSE Font Descriptor Data",
-            TSE_DATA_TABLE_DATA_1: "TSE Data Table Data 1",
-            TSE_DATA_TABLE_DATA_2: "TSE Data Table Data 2",
-            STATE_FLOW_TEMPLATE_DATA: "State Flow Template Data",
-            STATE_FLOW_TEMPLATE_DATA_2: "State Flow Template Data 2",
-            SQUEAK_STREAM_DATA: "Squeak Stream Data",
-            SQUEAK_STREAM_DATA_2: "Squeak Stream Data 2",
-            ENTITY_PLACEMENT_DATA: "Entity Placement Data",
-            ENTITY_PLACEMENT_DATA_2: "Entity Placement Data 2",
-            ENTITY_PLACEMENT_BCC_DATA: "Entity Placement BCC Data",
-            ENTITY_PLACEMENT_LEVEL_DATA: "Entity Placement Level Data",
-            ENTITY_TEMPLATE_DATA: "Entity Template Data",
-            TSE_TEXTURE_DATA_WII: "TSE Texture Data (Wii)"
-        }
-
-        for i, (record_size, record_type, record_data, record_pos) in enumerate(self.records):
-            details_summary = record_type_names.get(record_type, f"Unknown (0x{record_type:08X})")
-            if record_type == FILENAME_HEADER:
-                folder, filename = self.parse_filename_header(record_data)
-                details_summary = f"File: {filename}"
-                if folder:
-                    details_summary += f" (in {folder})"
-            elif record_type == TSE_TEXTURE_HEADER:
-                width, height, texture_format = self.texture_decoder.parse_texture_header(record_data)
-                details_summary = f"Texture Header: {width}x{height} ({texture_format})"
-                current_texture_id_awaiting_data = f"texture_{len(self.textures)}"
-                self.textures[current_texture_id_awaiting_data] = {
-                    'width': width,
-                    'height': height,
-                    'format': texture_format,
-                    'header_pos': record_pos,
-                    'data': None,
-                    'data_pos': None
-                }
-            elif record_type in (TSE_TEXTURE_DATA, TSE_TEXTURE_DATA_WII, TSE_TEXTURE_DATA_2):
-                details_summary = "Texture Data"
-                if current_texture_id_awaiting_data and current_texture_id_awaiting_data in self.textures:
-                    self.textures[current_texture_id_awaiting_data]['data'] = record_data
-                    self.textures[current_texture_id_awaiting_data]['data_pos'] = record_pos
-                    tex_info = self.textures[current_texture_id_awaiting_data]
-                    details_summary += f" ( {tex_info['width']}x{tex_info['height']} {tex_info['format']})"
-                    current_texture_id_awaiting_data = None
-                else:
-                    details_summary += " (Orphaned? No preceding header)"
-            self.tree.insert(
-                "", "end", iid=str(i),
-                values=(f"0x{record_type:08X}", f"{record_size} bytes", details_summary),
-                tags=(f"pos_{record_pos}", f"type_{record_type}")
-            )
+        self.texture_by_record.clear()
+        self.pending_texture_id = None
+        self.shown_record_index = None
+
+    def pair_texture(self, i, record):
+        """Pair texture headers with the data record that follows them, using record types only."""
+        if record.type == TSE_TEXTURE_HEADER:
+            self.pending_texture_id = f"texture_{len(self.textures)}"
+            self.textures[self.pending_texture_id] = {
+                'header_index': i,
+                'data_index': None
+            }
+            self.texture_by_record[i] = self.pending_texture_id
+        elif record.type in (TSE_TEXTURE_DATA, TSE_TEXTURE_DATA_WII, TSE_TEXTURE_DATA_2):
+            if self.pending_texture_id and self.pending_texture_id in self.textures:
+                self.textures[self.pending_texture_id]['data_index'] = i
+                self.texture_by_record[i] = self.pending_texture_id
+                self.pending_texture_id = None
+
+    def texture_info(self, tex_id):
+        """Texture metadata with width/height/format parsed from its header on first use."""
+        tex_meta = self.textures[tex_id]
+        if 'format' not in tex_meta:
+            width, height, texture_format = self.get_texture_header(tex_meta['header_index'])
+            tex_meta.update(width=width, height=height, format=texture_format)
+        return tex_meta
+
+    def record_row(self, i):
+        """Return (values, tags) of the tree row for record i."""
+        record_offset, record_size, record_type = self.records[i]
+        details_summary = RECORD_TYPE_NAMES.get(record_type, f"Unknown (0x{record_type:08X})")
+        if record_type == FILENAME_HEADER:
+            folder, filename = self.get_filename_header(i)
+            details_summary = f"File: {filename}"
+            if folder:
+                details_summary += f" (in {folder})"
+        elif record_type == TSE_TEXTURE_HEADER:
+            width, height, texture_format = self.get_texture_header(i)
+            details_summary = f"Texture Header: {width}x{height} ({texture_format})"
+        elif record_type in (TSE_TEXTURE_DATA, TSE_TEXTURE_DATA_WII, TSE_TEXTURE_DATA_2):
+            details_summary = "Texture Data"
+            if i in self.texture_by_record:
+                tex_info = self.texture_info(self.texture_by_record[i])
+                details_summary += f" ( {tex_info['width']}x{tex_info['height']} {tex_info['format']})"
+            else:
+                details_summary += " (Orphaned? No preceding header)"
+        return (
+            (f"0x{record_type:08X}", f"{record_size} bytes", details_summary),
+            (f"pos_{record_offset}", f"type_{record_type}")
+        )
+
+    def describe_record(self, i, record):
+        """Pair record i and, unless the list is virtual, build its tree row."""
+        self.pair_texture(i, record)
+        if self.virtual_tree is not None:
+            return None
+        values, tags = self.record_row(i)
+        return str(i), values, tags
+
+    def insert_rows(self, rows):
+        for iid, values, tags in rows:
+            self.tree.insert("", "end", iid=iid, values=values, tags=tags)
+
+    def populate_tree(self, parsed_records):
+        self.clear_views()
+        self.records = parsed_records
+        rows = [self.describe_record(i, record) for i, record in enumerate(self.records)]
+        if self.virtual_tree is not None:
+            self.virtual_tree.set_count(len(self.records))
+        else:
+            self.insert_rows(rows)
 
     def show_details(self, event):
         selection = self.tree.selection()
@@ -286,59 +816,63 @@ class HunkfileViewer:
         selected_item_iid = selection[0]
         try:
             record_index = int(selected_item_iid)
-            _record_size, record_type, record_data, record_pos = self.records[record_index]
+            record_offset, record_size, record_type = self.records[record_index]
         except (ValueError, IndexError):
             self.details.delete(1.0, tk.END)
             self.details.insert(tk.END, "Error: Could not retrieve record details.")
             return
+        if record_index == self.shown_record_index:
+            return  # re-selected after the virtual list redrew its rows
+        self.shown_record_index = record_index
         self.details.delete(1.0, tk.END)
         self.details.insert(tk.END, f"Record Type: 0x{record_type:08X}\n")
-        self.details.insert(tk.END, f"Record Size: {_record_size} bytes\n")
-        self.details.insert(tk.END, f"Record Position (end in file): {record_pos} bytes\n")
+        self.details.insert(tk.END, f"Record Size: {record_size} bytes\n")
+        self.details.insert(tk.END, f"Record Position (start in file): {record_offset} bytes\n")
+        tex_id = self.texture_by_record.get(record_index)
+        tex_meta = self.texture_info(tex_id) if tex_id else None
         if record_type == FILENAME_HEADER:
-            folder, filename = self.parse_filename_header(record_data)
+            folder, filename = self.get_filename_header(record_index)
             self.details.insert(tk.END, f"Parsed Folder: {folder}\n")
             self.details.insert(tk.END, f"Parsed Filename: {filename}\n")
         elif record_type == TSE_TEXTURE_HEADER:
-            width, height, texture_format = self.texture_decoder.parse_texture_header(record_data)
+            width, height, texture_format = self.get_texture_header(record_index)
             self.details.insert(tk.END, f"Texture Dimensions: {width}x{height}\n")
             self.details.insert(tk.END, f"Detected Format: {texture_format}\n")
-            for tex_id, tex_meta in self.textures.items():
-                if tex_meta['header_pos'] == record_pos and tex_meta['data'] is not None:
-                    self.details.insert(tk.END, "Associated texture data found.\n")
-                    if tex_meta['width'] > 0 and tex_meta['height'] > 0:
-                        self.show_texture(
-                            tex_meta['data'],
-                            tex_meta['width'],
-                            tex_meta['height'],
-                            tex_meta['format']
-                        )
-                    break
+            if tex_meta and tex_meta['data_index'] is not None:
+                self.details.insert(tk.END, "Associated texture data found.\n")
+                if tex_meta['width'] > 0 and tex_meta['height'] > 0:
+                    self.show_texture(
+                        self.archive.load_payload(tex_meta['data_index']),
+                        tex_meta['width'],
+                        tex_meta['height'],
+                        tex_meta['format'],
+                        cache_key=self.records[tex_meta['data_index']].offset,
+                        header_data=self.archive.load_payload(record_index)
+                    )
         elif record_type in (TSE_TEXTURE_DATA, TSE_TEXTURE_DATA_WII, TSE_TEXTURE_DATA_2):
             self.details.insert(tk.END, "This is raw texture data.\n")
-            found_texture_for_data = False
-            for tex_id, tex_meta in self.textures.items():
-                if tex_meta.get('data_pos') == record_pos:
-                    self.details.insert(tk.END, f"Associated with Texture Header:\n")
-                    self.details.insert(tk.END, f"  Dimensions: {tex_meta['width']}x{tex_meta['height']}\n")
-                    self.details.insert(tk.END, f"  Format: {tex_meta['format']}\n")
-                    if tex_meta['width'] > 0 and tex_meta['height'] > 0 and tex_meta['data']:
-                        self.show_texture(
-                            tex_meta['data'],
-                            tex_meta['width'],
-                            tex_meta['height'],
-                            tex_meta['format']
-                        )
-                    else:
-                        self.canvas.delete("all")
-                        self.canvas.create_text(50,50, text="Texture data available, but metadata (W/H) is invalid or data is missing.", fill="orange")
-                    found_texture_for_data = True
-                    break
-            if not found_texture_for_data:
-                self.canvas.delete("all")
+            if tex_meta:
+                self.details.insert(tk.END, f"Associated with Texture Header:\n")
+                self.details.insert(tk.END, f"  Dimensions: {tex_meta['width']}x{tex_meta['height']}\n")
+                self.details.insert(tk.END, f"  Format: {tex_meta['format']}\n")
+                if tex_meta['width'] > 0 and tex_meta['height'] > 0 and record_size:
+                    self.show_texture(
+                        self.archive.load_payload(record_index),
+                        tex_meta['width'],
+                        tex_meta['height'],
+                        tex_meta['format'],
+                        cache_key=record_offset,
+                        header_data=self.archive.load_payload(tex_meta['header_index'])
+                    )
+                else:
+                    self.texture_view.clear()
+                    self.canvas.create_text(50,50, text="Texture data available, but metadata (W/H) is invalid or data is missing.", fill="orange")
+            else:
+                self.texture_view.clear()
                 self.canvas.create_text(50,50, text="Texture data found, but no associated header information in current parse.", fill="orange")
         self.details.insert(tk.END, "\nHex Data (first 64 bytes or less):\n")
-        max_hex_bytes = min(len(record_data), 64)
+        max_hex_bytes = min(record_size, 64)
+        record_data = self.archive.read_at(record_offset, max_hex_bytes)
         hex_lines = []
         for i in range(0, max_hex_bytes, 16):
             chunk = record_data[i:i+16]
@@ -346,11 +880,13 @@ class HunkfileViewer:
             ascii_str = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in chunk)
             hex_lines.append(f"{i:04X}: {hex_str:<48} {ascii_str}")
         self.details.insert(tk.END, "\n".join(hex_lines))
-        if len(record_data) > max_hex_bytes:
+        if record_size > max_hex_bytes:
             self.details.insert(tk.END, "\n...")
+        self.prefetch_neighbours(tex_id)
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = HunkfileViewer(root)
     root.geometry("1200x800")
     root.mainloop()
+    app.prefetcher.shutdown()
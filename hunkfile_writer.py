@@ -0,0 +1,100 @@
+# hunkfile_writer.py
+# Writes .hnk archives back out with some records replaced
+import os
+import tempfile
+from hunkfile_reader import RECORD_HEADER, copy_range, iter_records
+
+MAX_RECORD_SIZE = 0xFFFFFFFF
+
+
+def _copy(src, dst, offset, length):
+    if length > 0 and copy_range(src, dst, offset, length) != length:
+        raise IOError("Unexpected end of archive while copying records.")
+    return max(0, length)
+
+
+def write_hunkfile(source, output, replacements, records=None, warnings=None):
+    """Write archive source to output with replacements applied, in one streaming pass.
+
+    replacements maps record index -> new payload (bytes-like). A replaced record keeps
+    its type and gets a header with the new size. Everything else (runs of untouched
+    records with their headers, and any bytes after the last readable record) is copied
+    from source with copy_range, never read into Python. records, if given, is the
+    archive's record list, which saves walking the headers again.
+    Returns the number of bytes written.
+    """
+    replacements = {index: memoryview(payload).cast('B') for index, payload in replacements.items()}
+    for index, payload in replacements.items():
+        if len(payload) > MAX_RECORD_SIZE:
+            raise ValueError(f"Replacement for record {index} is too large for a record header.")
+    if records is None:
+        records = iter_records(source, warnings=warnings)
+    try:
+        with open(source, 'rb') as src, open(output, 'wb') as dst:
+            file_size = os.fstat(src.fileno()).st_size
+            written = 0
+            copied_to = 0  # source bytes before this have been written out
+            for index, record in enumerate(records):
+                payload = replacements.pop(index, None)
+                if payload is None:
+                    continue
+                header_start = record.offset - RECORD_HEADER.size
+                written += _copy(src, dst, copied_to, header_start - copied_to)
+                dst.write(RECORD_HEADER.pack(len(payload), record.type))
+                dst.write(payload)
+                written += RECORD_HEADER.size + len(payload)
+                copied_to = record.offset + record.size
+            if replacements:
+                raise IndexError(f"Archive has no record {min(replacements)}.")
+            written += _copy(src, dst, copied_to, file_size - copied_to)
+        return written
+    except BaseException:
+        try:
+            os.remove(output)
+        except OSError:
+            pass
+        raise
+
+
+def patch_hunkfile(filename, replacements, records=None):
+    """Overwrite records of filename in place with payloads of exactly their current size.
+
+    Every replacement is checked before anything is written, so a ValueError leaves
+    the file untouched.
+    """
+    if records is None:
+        records = list(iter_records(filename))
+    patches = []
+    for index, payload in replacements.items():
+        payload = memoryview(payload).cast('B')
+        if not 0 <= index < len(records):
+            raise IndexError(f"Archive has no record {index}.")
+        if len(payload) != records[index].size:
+            raise ValueError(f"Record {index} is {records[index].size} bytes, its replacement {len(payload)}.")
+        patches.append((records[index].offset, payload))
+    with open(filename, 'r+b') as f:
+        for offset, payload in sorted(patches, key=lambda patch: patch[0]):
+            f.seek(offset)
+            f.write(payload)
+
+
+def replace_records(filename, replacements, records=None):
+    """Apply replacements to filename itself.
+
+    Same-size edits are patched in place. Otherwise the archive is repacked into a
+    temporary file next to it, which then takes its place.
+    """
+    if records is None:
+        records = list(iter_records(filename))
+    if all(0 <= index < len(records) and memoryview(payload).nbytes == records[index].size
+           for index, payload in replacements.items()):
+        patch_hunkfile(filename, replacements, records)
+        return
+    fd, temp_path = tempfile.mkstemp(prefix=".repack-", suffix=".hnk", dir=os.path.dirname(os.path.abspath(filename)))
+    os.close(fd)
+    try:
+        write_hunkfile(filename, temp_path, replacements, records)
+        os.replace(temp_path, filename)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
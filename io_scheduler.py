@@ -0,0 +1,81 @@
+# io_scheduler.py
+# Orders and coalesces reads of record ranges, so bulk operations sweep each archive front to back
+from collections import namedtuple
+from hunkfile_reader import read_range
+
+# unwanted bytes worth reading between two ranges to save a seek
+DEFAULT_MAX_GAP = 64 * 1024
+# largest single read a run of ranges is merged into
+DEFAULT_MAX_SPAN = 8 * 1024 * 1024
+
+ReadRequest = namedtuple('ReadRequest', ['path', 'offset', 'length'])
+# one coalesced read of bytes [start, end) of path, covering requests[i] for i in indices
+ReadSpan = namedtuple('ReadSpan', ['path', 'start', 'end', 'indices'])
+
+
+def disk_order(requests):
+    """Indices of requests sorted by (path, offset), for work that reads by itself (e.g. kernel copies)."""
+    return sorted(range(len(requests)), key=lambda i: (requests[i].path, requests[i].offset))
+
+
+def plan_reads(requests, max_gap=DEFAULT_MAX_GAP, max_span=DEFAULT_MAX_SPAN, max_requests=None):
+    """Group requests into ReadSpans in (path, offset) order.
+
+    A request joins the previous span when it starts at most max_gap bytes past its end
+    (or overlaps it), the span stays within max_span bytes and, if max_requests is given,
+    holds fewer than max_requests requests; a single request larger than max_span gets a
+    span of its own.
+    """
+    spans = []
+    path = start = end = None
+    indices = []
+    for i in disk_order(requests):
+        request = requests[i]
+        request_end = request.offset + request.length
+        if (indices and request.path == path and request.offset - end <= max_gap
+                and max(end, request_end) - start <= max_span
+                and (max_requests is None or len(indices) < max_requests)):
+            end = max(end, request_end)
+            indices.append(i)
+            continue
+        if indices:
+            spans.append(ReadSpan(path, start, end, indices))
+        path, start, end, indices = request.path, request.offset, request_end, [i]
+    if indices:
+        spans.append(ReadSpan(path, start, end, indices))
+    return spans
+
+
+def span_payloads(span, data, requests):
+    """Yield (index, payload) for each request in span, payload being a memoryview into data,
+    the bytes read for the span. A payload is short if the file ended early."""
+    view = memoryview(data)
+    for i in span.indices:
+        request = requests[i]
+        yield i, view[request.offset - span.start:request.offset - span.start + request.length]
+
+
+def iter_reads(requests, max_gap=DEFAULT_MAX_GAP, max_span=DEFAULT_MAX_SPAN):
+    """Yield (index, payload) for every request in disk order, one coalesced read per span.
+
+    Only one span is held at a time, as long as the caller lets go of the payloads.
+    """
+    fp = None
+    try:
+        for span in plan_reads(requests, max_gap, max_span):
+            if fp is None or fp.name != span.path:
+                if fp is not None:
+                    fp.close()
+                fp = open(span.path, 'rb')
+            yield from span_payloads(span, read_range(fp, span.start, span.end - span.start), requests)
+    finally:
+        if fp is not None:
+            fp.close()
+
+
+def read_all(requests, max_gap=DEFAULT_MAX_GAP, max_span=DEFAULT_MAX_SPAN):
+    """Read every request and return the payloads in the caller's original order."""
+    payloads = [None] * len(requests)
+    for i, payload in iter_reads(requests, max_gap, max_span):
+        payloads[i] = payload
+    return payloads
@@ -39,4 +39,10 @@ ENTITY_PLACEMENT_LEVEL_DATA = 0x102009
 ENTITY_TEMPLATE_DATA = 0x101008
 
 # Wii-specific record type
-TSE_TEXTURE_DATA_WII = 0x202151
\ No newline at end of file
+TSE_TEXTURE_DATA_WII = 0x202151
+
+# Scooby-Doo texture record types
+TSE_TEXTURE_HEADER_SCOOBY_DOO = 0x41056
+TSE_TEXTURE_DATA_SCOOBY_DOO = 0x40057
+TSE_TEXTURE_HEADER_SCOOBY_DOO_WII = 0x41033
+TSE_TEXTURE_DATA_SCOOBY_DOO_WII = 0x201035
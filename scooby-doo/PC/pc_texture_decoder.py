@@ -70,7 +70,7 @@ class PCTextureDecoder(TextureDecoder):
         num_blocks_high = max(1, (height + 3) // 4)
         return num_blocks_wide * num_blocks_high * block_size
 
-    def decode_texture(self, texture_data, width, height, texture_format):
+    def decode_texture(self, texture_data, width, height, texture_format, tlut=None):
         if width == 0 or height == 0:
             return None
         try:
@@ -101,7 +101,7 @@ class WiiTextureDecoder(TextureDecoder):
         except Exception as e:
             pass
 
-    def decode_texture(self, texture_data, width, height, texture_format):
+    def decode_texture(self, texture_data, width, height, texture_format, tlut=None):
         if width == 0 or height == 0:
             return None
         try:
@@ -4,8 +4,8 @@ from PIL import Image
 
 class TextureDecoder(ABC):
     @abstractmethod
-    def decode_texture(self, texture_data, width, height, texture_format):
-        """Decode texture data and return a PIL Image."""
+    def decode_texture(self, texture_data, width, height, texture_format, tlut=None):
+        """Decode texture data and return a PIL Image. tlut is unused by these decoders."""
         pass
 
     @abstractmethod
@@ -0,0 +1,131 @@
+# texture_batch.py
+# Batch texture decoding on a process pool, with the pixels handed back through shared memory
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+import numpy as np
+from export_textures import get_decoder
+from hunkfile_reader import read_payload
+
+# everything a worker needs to find and decode one texture; mip level 0 is decoded
+DecodeRequest = namedtuple('DecodeRequest', ['archive', 'offset', 'length', 'platform', 'format', 'width', 'height'])
+
+
+def decode_into(request, shm_name):
+    """Read and decode one texture straight into the shared memory block shm_name. Runs in a worker process.
+
+    Returns an error message, or None on success.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        decoder = get_decoder(request.platform)
+        with open(request.archive, 'rb') as f:
+            texture_data = read_payload(f, request.offset, request.length)
+        texture_data, tlut = decoder.split_tlut(texture_data, request.width, request.height, request.format)
+        width, height, level_data = decoder.mip_levels(texture_data, request.width, request.height, request.format)[0]
+        pixels = decoder.decode_texture_array(level_data, width, height, request.format, tlut)
+        if pixels is None:
+            return f"could not decode {request.format} texture"
+        out = np.ndarray((height, width, 4), dtype=np.uint8, buffer=shm.buf)
+        out[...] = pixels
+        del out  # the view must go before the block can be closed
+        return None
+    except Exception as e:
+        return str(e)
+    finally:
+        shm.close()
+
+
+class DecodedTexture:
+    """One decoded texture. pixels is a (height, width, 4) view of a shared memory block.
+
+    The block belongs to this process; close() frees it, after which pixels must not
+    be used. Copy the array to keep it longer.
+    """
+
+    def __init__(self, request, shm, error=None):
+        self.request = request
+        self.error = error
+        self._shm = shm
+        self.pixels = None
+        if error is None:
+            self.pixels = np.ndarray((request.height, request.width, 4), dtype=np.uint8, buffer=shm.buf)
+
+    def close(self):
+        self.pixels = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BatchTextureDecoder:
+    """Decodes many textures on worker processes without pickling any pixel data.
+
+    For each request the parent creates a shared memory block of the output size and
+    sends the worker only the request and the block's name. The worker reads the
+    payload from the archive itself and decodes into the block.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        workers = workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        # caps how many output blocks exist before the caller has taken them
+        self.max_pending = max_pending or 2 * workers
+
+    def decode(self, requests):
+        """Yield a DecodedTexture per request, in the order they finish. Close each one when done with it."""
+        pending = {}
+        try:
+            for request in requests:
+                if request.width <= 0 or request.height <= 0:
+                    yield DecodedTexture(request, None, "invalid dimensions")
+                    continue
+                shm = shared_memory.SharedMemory(create=True, size=request.width * request.height * 4)
+                try:
+                    pending[self._pool.submit(decode_into, request, shm.name)] = (request, shm)
+                except Exception:
+                    shm.close()
+                    shm.unlink()
+                    raise
+                while len(pending) >= self.max_pending:
+                    yield from self._collect(pending)
+            while pending:
+                yield from self._collect(pending)
+        finally:
+            # the caller stopped early or something failed: free the blocks nobody will see
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            for _request, shm in pending.values():
+                shm.close()
+                shm.unlink()
+
+    def _collect(self, pending):
+        done, _not_done = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            request, shm = pending.pop(future)
+            try:
+                error = future.result()
+            except Exception as e:
+                error = str(e)
+            texture = DecodedTexture(request, shm, error)
+            if error is not None:
+                texture.close()
+            yield texture
+
+    def shutdown(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,200 @@
+# texture_cache.py
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_BUDGET_MB = 256
+DEFAULT_DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hunkfile_viewer", "textures")
+DEFAULT_DISK_CACHE_MB = 2048
+# bump when decoder output changes so stale pixels are never served
+DISK_CACHE_VERSION = 1
+DISK_ENTRY_HEADER = struct.Struct('<4sBII')
+DISK_ENTRY_MAGIC = b'HTXC'
+FLAG_ZLIB = 0x01
+
+
+def image_nbytes(image):
+    """Approximate memory held by a decoded PIL image or NumPy array."""
+    if hasattr(image, 'nbytes'):
+        return image.nbytes
+    return image.width * image.height * len(image.getbands())
+
+
+class TextureCache:
+    """Least-recently-used cache of decoded images bounded by a memory budget."""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, image):
+        size = image_nbytes(image)
+        with self._lock:
+            if key in self._entries:
+                self.used -= self._entries.pop(key)[1]
+            if size > self.budget:
+                return  # would evict everything else and still not fit
+            self._entries[key] = (image, size)
+            self.used += size
+            self._evict()
+
+    def set_budget(self, budget_mb):
+        with self._lock:
+            self.budget = int(budget_mb * 1024 * 1024)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used = 0
+
+    def _evict(self):
+        while self.used > self.budget and self._entries:
+            _key, (_image, size) = self._entries.popitem(last=False)
+            self.used -= size
+
+    def stats_text(self):
+        return (f"Texture cache: {self.hits} hits / {self.misses} misses | "
+                f"{self.used / (1024 * 1024):.1f} of {self.budget / (1024 * 1024):.0f} MB, {len(self._entries)} images")
+
+
+class DiskTextureCache:
+    """Directory of decoded RGBA textures keyed by a hash of the texture header and payload.
+
+    Identical textures in different archives share an entry. Entries are raw
+    RGBA, optionally zlib-compressed at the fastest level, and the oldest
+    (least recently read) are deleted once the directory exceeds max_mb.
+    """
+
+    def __init__(self, directory=DEFAULT_DISK_CACHE_DIR, max_mb=DEFAULT_DISK_CACHE_MB, compress=True):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.used = sum(size for _path, size, _mtime in self._entries())
+
+    @staticmethod
+    def texture_key(header_data, texture_data, width, height, texture_format, level=0, decoder_name='', tlut=None):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{DISK_CACHE_VERSION}|{decoder_name}|{width}x{height}|{texture_format}|{level}|".encode('utf-8'))
+        digest.update(header_data or b'')
+        digest.update(texture_data)
+        if tlut is not None:
+            digest.update(f"|{tlut[1]}|".encode('utf-8'))
+            digest.update(tlut[0])
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.rgba')
+
+    def _entries(self):
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.rgba'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue  # removed by another process meanwhile
+                    yield entry.path, st.st_size, st.st_mtime
+
+    def get(self, key):
+        """Return the cached (height, width, 4) uint8 array for key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                magic, flags, width, height = DISK_ENTRY_HEADER.unpack(f.read(DISK_ENTRY_HEADER.size))
+                pixels = f.read()
+            if magic != DISK_ENTRY_MAGIC:
+                raise ValueError("not a texture cache entry")
+            if flags & FLAG_ZLIB:
+                pixels = zlib.decompress(pixels)
+            image = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 4)
+            os.utime(path)  # eviction goes by last use
+        except (OSError, ValueError, struct.error, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return image
+
+    def put(self, key, image):
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        pixels = image.tobytes()
+        flags = 0
+        if self.compress:
+            pixels = zlib.compress(pixels, 1)
+            flags |= FLAG_ZLIB
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(DISK_ENTRY_HEADER.pack(DISK_ENTRY_MAGIC, flags, width, height))
+                f.write(pixels)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self.used += DISK_ENTRY_HEADER.size + len(pixels)
+            over_budget = self.used > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache is back under 90% of max_mb."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            self.used = sum(size for _path, size, _mtime in entries)
+            target = self.max_bytes * 9 // 10
+            for path, size, _mtime in entries:
+                if self.used <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self.used -= size
+                except OSError:
+                    pass
+
+    def decode(self, decoder, header_data, texture_data, width, height, texture_format, level=0, tlut=None):
+        """Decode through decoder.decode_texture_array, serving and storing results in the cache."""
+        key = self.texture_key(header_data, texture_data, width, height, texture_format, level,
+                               type(decoder).__name__, tlut)
+        image = self.get(key)
+        if image is None:
+            image = decoder.decode_texture_array(texture_data, width, height, texture_format, tlut)
+            if image is not None:
+                self.put(key, image)
+        return image
@@ -0,0 +1,273 @@
+# texture_canvas.py
+import math
+import tkinter as tk
+from collections import OrderedDict
+from PIL import Image, ImageTk
+
+TILE_SIZE = 256
+TILE_CACHE_SIZE = 192
+RESIZE_DEBOUNCE_MS = 150
+ZOOM_STEP = 1.25
+MIN_ZOOM = 1 / 64
+MAX_ZOOM = 32.0
+
+
+class TexturePyramid:
+    """Resolution levels of one texture, each half the size of the one before.
+
+    level_source(k) returns the decoded image of level k (e.g. mip k), or None if the
+    texture has no such level, in which case it is downsampled from level k - 1.
+    Levels are only built when first asked for.
+    """
+
+    def __init__(self, width, height, level_source):
+        self.width = width
+        self.height = height
+        self.level_source = level_source
+        self.level_count = max(1, math.ceil(math.log2(max(width, height, 1))) + 1)
+        self._levels = {}
+        self._failed = set()
+
+    def set_level(self, level, image):
+        self._levels[level] = image
+
+    def level_for_zoom(self, zoom):
+        """Coarsest level that still has at least one texel per screen pixel at zoom."""
+        level = 0
+        while level + 1 < self.level_count and zoom * (1 << (level + 1)) <= 1.0:
+            level += 1
+        return level
+
+    def level_image(self, level):
+        """Image of the given level, or of the nearest coarser level that could be built."""
+        for candidate in range(level, self.level_count):
+            image = self._build(candidate)
+            if image is not None:
+                return candidate, image
+        raise ValueError("No level of this texture could be decoded")
+
+    def _build(self, level):
+        if level in self._levels:
+            return self._levels[level]
+        if level in self._failed:
+            return None
+        image = None
+        try:
+            image = self.level_source(level)
+        except Exception as e:
+            print(f"Error decoding texture level {level}: {e}")
+        if image is None and level > 0:
+            finer = self._levels.get(level - 1)
+            if finer is None and level - 1 not in self._failed:
+                finer = self._build(level - 1)
+            if finer is not None:
+                image = finer.reduce(2) if finer.width > 1 and finer.height > 1 else finer
+        if image is None:
+            self._failed.add(level)
+            return None
+        self._levels[level] = image
+        return image
+
+
+class TextureCanvas:
+    """Zoom/pan view of a TexturePyramid on a tk.Canvas.
+
+    Only the tiles inside the viewport exist as PhotoImages; they are cut from the
+    pyramid level that matches the zoom and kept in a small LRU for panning back.
+    Wheel zooms around the pointer, dragging pans, "0" fits and "1" shows 1:1.
+    """
+
+    def __init__(self, canvas, scrollbar_x, scrollbar_y):
+        self.canvas = canvas
+        self.pyramid = None
+        self.info_text = ""
+        self.zoom = 1.0
+        self.fit = True
+        self.info_item = None
+        self.shown_tiles = {}
+        self.tile_cache = OrderedDict()
+        self._resize_job = None
+        self._render_job = None
+        self._last_size = None
+        scrollbar_x.configure(command=self.xview)
+        scrollbar_y.configure(command=self.yview)
+        canvas.configure(xscrollcommand=scrollbar_x.set, yscrollcommand=scrollbar_y.set)
+        canvas.bind("<Configure>", self.on_configure)
+        canvas.bind("<MouseWheel>", lambda e: self.zoom_at(ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP, e.x, e.y))
+        canvas.bind("<Button-4>", lambda e: self.zoom_at(ZOOM_STEP, e.x, e.y))
+        canvas.bind("<Button-5>", lambda e: self.zoom_at(1 / ZOOM_STEP, e.x, e.y))
+        canvas.bind("<ButtonPress-1>", self.on_press)
+        canvas.bind("<B1-Motion>", self.on_drag)
+        canvas.bind("<Key-plus>", lambda e: self.zoom_at(ZOOM_STEP))
+        canvas.bind("<Key-equal>", lambda e: self.zoom_at(ZOOM_STEP))
+        canvas.bind("<Key-minus>", lambda e: self.zoom_at(1 / ZOOM_STEP))
+        canvas.bind("<Key-0>", lambda e: self.zoom_to_fit())
+        canvas.bind("<Key-1>", lambda e: self.set_zoom(1.0))
+
+    def viewport(self):
+        return max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height())
+
+    def clear(self):
+        """Forget the texture and empty the canvas, e.g. before drawing a message."""
+        self.cancel_render()
+        self.pyramid = None
+        self.info_item = None
+        self.shown_tiles.clear()
+        self.tile_cache.clear()
+        self.canvas.delete("all")
+        self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+        self.zoom = 1.0
+
+    def show(self, pyramid, info_text, zoom=None):
+        """Display pyramid, fitted to the viewport unless a zoom is given."""
+        self.clear()
+        self.pyramid = pyramid
+        self.info_text = info_text
+        self.info_item = self.canvas.create_text(10, 10, text=info_text, anchor=tk.NW, fill="black")
+        if zoom is None:
+            self.zoom_to_fit()
+        else:
+            self.set_zoom(zoom)
+
+    def fit_zoom(self):
+        view_width, view_height = self.viewport()
+        return min(1.0, view_width / self.pyramid.width, view_height / self.pyramid.height)
+
+    def zoom_to_fit(self):
+        if self.pyramid is None:
+            return
+        self.set_zoom(self.fit_zoom())
+        self.fit = True
+
+    def set_zoom(self, zoom, anchor_x=0, anchor_y=0):
+        """Zoom keeping the texel under widget position (anchor_x, anchor_y) in place."""
+        if self.pyramid is None:
+            return
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+        texel_x = self.canvas.canvasx(anchor_x) / self.zoom
+        texel_y = self.canvas.canvasy(anchor_y) / self.zoom
+        self.zoom = zoom
+        self.fit = False
+        content_width = max(1, round(self.pyramid.width * zoom))
+        content_height = max(1, round(self.pyramid.height * zoom))
+        self.canvas.configure(scrollregion=(0, 0, content_width, content_height))
+        self.canvas.xview_moveto(max(0.0, texel_x * zoom - anchor_x) / content_width)
+        self.canvas.yview_moveto(max(0.0, texel_y * zoom - anchor_y) / content_height)
+        self.drop_tiles()
+        self.render()
+
+    def zoom_at(self, factor, x=None, y=None):
+        if self.pyramid is None:
+            return "break"
+        if x is None:
+            x, y = (size // 2 for size in self.viewport())
+        self.set_zoom(self.zoom * factor, x, y)
+        return "break"
+
+    def xview(self, *args):
+        self.canvas.xview(*args)
+        self.schedule_render()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_render()
+
+    def on_press(self, event):
+        self.canvas.focus_set()
+        self.canvas.scan_mark(event.x, event.y)
+
+    def on_drag(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.schedule_render()
+
+    def on_configure(self, event):
+        # a window drag fires many of these; only re-lay out once it settles
+        if (event.width, event.height) == self._last_size:
+            return
+        self._last_size = (event.width, event.height)
+        if self._resize_job is not None:
+            self.canvas.after_cancel(self._resize_job)
+        self._resize_job = self.canvas.after(RESIZE_DEBOUNCE_MS, self.on_resized)
+
+    def on_resized(self):
+        self._resize_job = None
+        if self.pyramid is None:
+            return
+        if self.fit:
+            self.zoom_to_fit()
+        else:
+            self.render()
+
+    def schedule_render(self):
+        if self._render_job is None:
+            self._render_job = self.canvas.after_idle(self.render)
+
+    def cancel_render(self):
+        if self._render_job is not None:
+            self.canvas.after_cancel(self._render_job)
+            self._render_job = None
+
+    def drop_tiles(self):
+        for item, _photo in self.shown_tiles.values():
+            self.canvas.delete(item)
+        self.shown_tiles.clear()
+
+    def render(self):
+        """Create the tiles that are in view and delete the ones that left it."""
+        self._render_job = None
+        if self.pyramid is None:
+            return
+        level, image = self.pyramid.level_image(self.pyramid.level_for_zoom(self.zoom))
+        scale_x = self.zoom * self.pyramid.width / image.width
+        scale_y = self.zoom * self.pyramid.height / image.height
+        # tiles cover TILE_SIZE screen pixels when magnified, so a tile never grows past that
+        span = max(1, int(TILE_SIZE / max(1.0, scale_x, scale_y)))
+        view_width, view_height = self.viewport()
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        first_x = max(0, int(left / scale_x) // span)
+        first_y = max(0, int(top / scale_y) // span)
+        last_x = min((image.width - 1) // span, int((left + view_width) / scale_x) // span)
+        last_y = min((image.height - 1) // span, int((top + view_height) / scale_y) // span)
+        wanted = {
+            (level, tile_x, tile_y)
+            for tile_y in range(first_y, last_y + 1)
+            for tile_x in range(first_x, last_x + 1)
+        }
+        for key in list(self.shown_tiles):
+            if key not in wanted:
+                self.canvas.delete(self.shown_tiles.pop(key)[0])
+        for key in sorted(wanted - self.shown_tiles.keys()):
+            _level, tile_x, tile_y = key
+            x0, y0 = round(tile_x * span * scale_x), round(tile_y * span * scale_y)
+            photo = self.tile_photo(image, key, span, scale_x, scale_y)
+            item = self.canvas.create_image(x0, y0, anchor=tk.NW, image=photo)
+            self.shown_tiles[key] = (item, photo)
+        if self.info_item is not None:
+            self.canvas.itemconfigure(self.info_item, text=f"{self.info_text} | Zoom {self.zoom * 100:.0f}%")
+            self.canvas.coords(self.info_item, left + 10, top + 10)
+            self.canvas.tag_raise(self.info_item)
+
+    def tile_photo(self, image, key, span, scale_x, scale_y):
+        cache_key = key + (self.zoom,)
+        photo = self.tile_cache.get(cache_key)
+        if photo is not None:
+            self.tile_cache.move_to_end(cache_key)
+            return photo
+        _level, tile_x, tile_y = key
+        left, top = tile_x * span, tile_y * span
+        right, bottom = min(image.width, left + span), min(image.height, top + span)
+        tile = image.crop((left, top, right, bottom))
+        # edges are rounded the same way for neighbouring tiles, so they meet without seams
+        size = (max(1, round(right * scale_x) - round(left * scale_x)),
+                max(1, round(bottom * scale_y) - round(top * scale_y)))
+        if size != tile.size:
+            # nearest when magnifying, so single texels can be inspected
+            resample = Image.Resampling.NEAREST if scale_x > 1 else Image.Resampling.BILINEAR
+            tile = tile.resize(size, resample)
+        photo = ImageTk.PhotoImage(tile)
+        self.tile_cache[cache_key] = photo
+        while len(self.tile_cache) > TILE_CACHE_SIZE:
+            self.tile_cache.popitem(last=False)
+        return photo
@@ -1,14 +1,122 @@
 # texture_decoder.py
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PIL import Image
 
+# block (or tile) rows per band when a texture is decoded on several threads
+DEFAULT_BAND_ROWS = 64
+
 class TextureDecoder(ABC):
+    # decode_bands() runs on this many threads; subclasses take both as constructor arguments
+    threads = 1
+    band_rows = DEFAULT_BAND_ROWS
+    # one pool per thread count, shared by every decoder
+    _band_pools = {}
+    _band_pools_lock = threading.Lock()
+
     @abstractmethod
-    def decode_texture(self, texture_data, width, height, texture_format):
-        """Decode texture data and return a PIL Image."""
+    def decode_texture(self, texture_data, width, height, texture_format, tlut=None):
+        """Decode texture data and return a PIL Image. tlut is the palette of paletted formats (see split_tlut)."""
         pass
 
     @abstractmethod
     def parse_texture_header(self, data):
         """Parse texture header and return (width, height, texture_format)."""
-        pass
\ No newline at end of file
+        pass
+
+    def decode_texture_array(self, texture_data, width, height, texture_format, tlut=None):
+        """Decode texture data and return a (height, width, 4) uint8 RGBA array, or None."""
+        img = self.decode_texture(texture_data, width, height, texture_format, tlut)
+        return None if img is None else np.asarray(img)
+
+    def decode_bands(self, block_rows, decode_band):
+        """Call decode_band(first_row, end_row) to cover block rows [0, block_rows).
+
+        With more than one thread, textures taller than band_rows are split into
+        bands decoded in parallel; NumPy releases the GIL for the heavy lifting.
+        Each band should write into its own slice of a preallocated output.
+        """
+        if self.threads <= 1 or block_rows <= self.band_rows:
+            decode_band(0, block_rows)
+            return
+        with self._band_pools_lock:
+            pool = self._band_pools.get(self.threads)
+            if pool is None:
+                pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="texture-band")
+                self._band_pools[self.threads] = pool
+        futures = [
+            pool.submit(decode_band, first, min(block_rows, first + self.band_rows))
+            for first in range(0, block_rows, self.band_rows)
+        ]
+        for future in futures:
+            future.result()
+
+    def split_tlut(self, texture_data, width, height, texture_format):
+        """Return (image data, tlut) of a texture payload; tlut is None unless the format is paletted."""
+        return texture_data, None
+
+    def level_size(self, width, height, texture_format):
+        """Size in bytes of one mip level, or None if the format's layout is unknown."""
+        return None
+
+    def mip_layout(self, width, height, texture_format, data_size):
+        """Return (width, height, offset, size) of each mip level in a payload of data_size bytes.
+
+        The level count is worked out from how many whole levels fit in the
+        payload; trailing bytes are ignored.
+        """
+        if self.level_size(width, height, texture_format) is None:
+            return [(width, height, 0, data_size)]
+        layout = []
+        offset = 0
+        level_width, level_height = width, height
+        while level_width > 0 and level_height > 0:
+            size = self.level_size(level_width, level_height, texture_format)
+            if offset + size > data_size:
+                break
+            layout.append((level_width, level_height, offset, size))
+            offset += size
+            if level_width == 1 and level_height == 1:
+                break
+            level_width, level_height = max(1, level_width // 2), max(1, level_height // 2)
+        return layout or [(width, height, 0, data_size)]
+
+    def mip_levels(self, texture_data, width, height, texture_format):
+        """Split texture_data into its mip chain.
+
+        Returns a list of (width, height, data) per level, where data is a
+        memoryview into texture_data (see mip_layout).
+        """
+        data = memoryview(texture_data)
+        return [
+            (level_width, level_height, data[offset:offset + size])
+            for level_width, level_height, offset, size in self.mip_layout(width, height, texture_format, len(data))
+        ]
+
+    @staticmethod
+    def select_mip_level(levels, display_width, display_height):
+        """Index of the smallest level still at least as large as the image shown in the given box."""
+        width, height = levels[0][0], levels[0][1]
+        ratio = min(1.0, display_width / width, display_height / height) if display_width > 0 and display_height > 0 else 1.0
+        wanted_width, wanted_height = width * ratio, height * ratio
+        chosen = 0
+        for i, (level_width, level_height, _data) in enumerate(levels):
+            if level_width < wanted_width or level_height < wanted_height:
+                break
+            chosen = i
+        return chosen
+
+    def decode_mip_array(self, texture_data, width, height, texture_format, level=0, tlut=None):
+        """Decode only the given mip level to a (height, width, 4) RGBA array."""
+        levels = self.mip_levels(texture_data, width, height, texture_format)
+        level_width, level_height, level_data = levels[min(level, len(levels) - 1)]
+        return self.decode_texture_array(level_data, level_width, level_height, texture_format, tlut)
+
+    def decode_mip(self, texture_data, width, height, texture_format, level=0, tlut=None):
+        """Decode only the given mip level to a PIL Image."""
+        levels = self.mip_levels(texture_data, width, height, texture_format)
+        level_width, level_height, level_data = levels[min(level, len(levels) - 1)]
+        return self.decode_texture(level_data, level_width, level_height, texture_format, tlut)
+
@@ -0,0 +1,194 @@
+# texture_encoder.py
+from abc import ABC, abstractmethod
+import numpy as np
+from PIL import Image
+
+ENCODE_MODES = ("fast", "quality")
+REFINE_ITERATIONS = 3
+# per-index weight of endpoint 0 in four- and three-colour blocks (index 3 of the latter is transparent)
+FOUR_COLOUR_WEIGHTS = np.array([1.0, 0.0, 2.0 / 3.0, 1.0 / 3.0], dtype=np.float32)
+THREE_COLOUR_WEIGHTS = np.array([1.0, 0.0, 0.5, 0.0], dtype=np.float32)
+
+
+class TextureEncoder(ABC):
+    """Base for block compressors that produce data the matching TextureDecoder reads back.
+
+    "fast" takes the colour endpoints from each block's bounding box; "quality" starts
+    from the principal axis and refines them by least squares against the palette the
+    decoder will actually build.
+    """
+
+    def __init__(self, mode="fast", iterations=REFINE_ITERATIONS):
+        if mode not in ENCODE_MODES:
+            raise ValueError(f"Unknown encode mode: {mode}")
+        self.mode = mode
+        self.iterations = iterations
+
+    @abstractmethod
+    def encode_level(self, pixels, texture_format):
+        """Encode a (height, width, 4) uint8 RGBA array into one level of texture data."""
+        pass
+
+    @abstractmethod
+    def expand_565(self, words):
+        """RGB565 words to (..., 3) int32 channels, exactly as the decoder expands them."""
+        pass
+
+    @abstractmethod
+    def interpolate(self, rgb0, rgb1, four_colour):
+        """Palette entries 2 and 3 for endpoint colours rgb0/rgb1, exactly as the decoder builds them."""
+        pass
+
+    @abstractmethod
+    def is_four_colour(self, word0, word1):
+        """Whether the decoder treats a block with these endpoint words as four-colour."""
+        pass
+
+    def encode_texture(self, image, texture_format, mip_count=1):
+        """Encode a PIL image or RGBA array, followed by mip_count - 1 box-filtered mip levels."""
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(np.asarray(image, dtype=np.uint8), "RGBA")
+        image = image.convert("RGBA")
+        levels = []
+        for _level in range(max(1, mip_count)):
+            levels.append(self.encode_level(np.asarray(image), texture_format))
+            if image.width == 1 and image.height == 1:
+                break
+            image = image.resize((max(1, image.width // 2), max(1, image.height // 2)), Image.Resampling.BOX)
+        return b"".join(levels)
+
+    @staticmethod
+    def image_blocks(pixels, tiles_wide, tiles_high, tile_width=4, tile_height=4):
+        """Cut pixels into (tiles_high, tiles_wide, tile_height * tile_width, 4) blocks, repeating the
+        last row and column into any padding."""
+        height, width = pixels.shape[:2]
+        rows = np.minimum(np.arange(tiles_high * tile_height), height - 1)
+        columns = np.minimum(np.arange(tiles_wide * tile_width), width - 1)
+        padded = pixels[rows[:, None], columns]
+        blocks = padded.reshape(tiles_high, tile_height, tiles_wide, tile_width, 4).swapaxes(1, 2)
+        return blocks.reshape(tiles_high, tiles_wide, tile_height * tile_width, 4)
+
+    @staticmethod
+    def quantize_565(rgb):
+        """(3, n) channel planes to RGB565 words."""
+        rgb = np.clip(rgb, 0, 255)
+        r = np.rint(rgb[0] * (31 / 255)).astype(np.uint16)
+        g = np.rint(rgb[1] * (63 / 255)).astype(np.uint16)
+        b = np.rint(rgb[2] * (31 / 255)).astype(np.uint16)
+        return (r << 11) | (g << 5) | b
+
+    def initial_endpoints(self, colours, opaque):
+        """Starting endpoints, two (3, n) arrays, from the opaque pixels of each block."""
+        weight = opaque.astype(np.float32)
+        count = np.maximum(weight.sum(axis=-1), 1.0)
+        mean = (colours * weight).sum(axis=-1) / count
+        centred = (colours - mean[..., None]) * weight
+        if self.mode == "fast":
+            low = np.where(opaque, colours, 255.0).min(axis=-1)
+            high = np.where(opaque, colours, 0.0).max(axis=-1)
+            low, high = np.minimum(low, high), np.maximum(low, high)
+            # pull the box in a little, so the interpolated colours land inside it
+            inset = (high - low) / 16.0
+            low, high = low + inset, high - inset
+            # use the box diagonal the colours actually run along: red and blue
+            # that fall as green rises swap their ends
+            flip = (centred * centred[1]).sum(axis=-1) < 0
+            return np.where(flip, low, high), np.where(flip, high, low)
+        covariance = np.einsum('ink,jnk->nij', centred, centred)
+        # a few power iterations are plenty for a 3x3 covariance
+        axis = np.ones((len(count), 3), dtype=np.float32)
+        for _step in range(8):
+            axis = np.einsum('nij,nj->ni', covariance, axis)
+            axis /= np.maximum(np.linalg.norm(axis, axis=1, keepdims=True), 1e-6)
+        axis = axis.T
+        projection = ((colours - mean[..., None]) * axis[..., None]).sum(axis=0)
+        low = np.where(opaque, projection, np.inf).min(axis=-1)
+        high = np.where(opaque, projection, -np.inf).max(axis=-1)
+        low = np.where(np.isfinite(low), low, 0.0)
+        high = np.where(np.isfinite(high), high, 0.0)
+        return mean + axis * high, mean + axis * low
+
+    def assign(self, colours, opaque, word0, word1, four_colour_only):
+        """Best palette index per pixel for the given endpoint words. Returns (indices, error per block)."""
+        rgb0 = self.expand_565(word0)
+        rgb1 = self.expand_565(word1)
+        four_colour = np.ones(len(word0), dtype=bool) if four_colour_only else self.is_four_colour(word0, word1)
+        rgb2, rgb3 = self.interpolate(rgb0, rgb1, four_colour[:, None])
+        # (channel, block, palette entry)
+        palette = np.stack((rgb0, rgb1, rgb2, rgb3), axis=-1).astype(np.float32).transpose(1, 0, 2)
+        # compare one (n, 16) distance plane per entry, cheaper than reducing a trailing axis of 4
+        best = indices = None
+        for entry in range(4):
+            distance = sum((colours[channel] - palette[channel][:, entry:entry + 1]) ** 2 for channel in range(3))
+            if entry == 3:
+                # index 3 of a three-colour block is transparent black, kept for transparent pixels
+                distance = np.where(four_colour[:, None], distance, np.inf)
+            if best is None:
+                best, indices = distance, np.zeros(distance.shape, dtype=np.uint8)
+            else:
+                closer = distance < best
+                best = np.where(closer, distance, best)
+                indices[closer] = entry
+        error = np.where(opaque, best, 0.0).sum(axis=-1)
+        indices[~opaque] = 3
+        return indices, error
+
+    def order_endpoints(self, word0, word1, wants_four_colour):
+        """Swap endpoints where needed so the decoder picks the wanted block mode."""
+        swap = self.is_four_colour(word0, word1) != wants_four_colour
+        # equal words can never be four-colour; leave them alone
+        swap &= word0 != word1
+        return np.where(swap, word1, word0), np.where(swap, word0, word1)
+
+    def refit(self, colours, opaque, indices, four_colour):
+        """Least-squares endpoints for fixed indices, over the opaque pixels of each block."""
+        weights = np.where(four_colour[:, None], FOUR_COLOUR_WEIGHTS[indices], THREE_COLOUR_WEIGHTS[indices])
+        a = np.where(opaque, weights, 0.0)
+        b = np.where(opaque, 1.0 - weights, 0.0)
+        aa, bb, ab = (a * a).sum(axis=-1), (b * b).sum(axis=-1), (a * b).sum(axis=-1)
+        ax = (a * colours).sum(axis=-1)
+        bx = (b * colours).sum(axis=-1)
+        determinant = aa * bb - ab * ab
+        solvable = np.abs(determinant) > 1e-6
+        determinant = np.where(solvable, determinant, 1.0)
+        endpoint0 = (bb * ax - ab * bx) / determinant
+        endpoint1 = (aa * bx - ab * ax) / determinant
+        return endpoint0, endpoint1, solvable
+
+    def compress_colours(self, blocks, four_colour_only=False):
+        """Pick endpoint words and indices for (n, 16, 4) RGBA blocks.
+
+        Pixels with alpha below 128 make a block three-colour with index 3, which the
+        decoder shows as transparent, unless four_colour_only is set (BC3 colour blocks).
+        Returns (word0, word1, indices).
+        """
+        # one contiguous (n, 16) plane per channel
+        colours = np.ascontiguousarray(blocks[..., :3].transpose(2, 0, 1), dtype=np.float32)
+        if four_colour_only:
+            opaque = np.ones(blocks.shape[:2], dtype=bool)
+        else:
+            opaque = blocks[..., 3] >= 128
+        wants_four_colour = opaque.all(axis=1)
+        endpoint0, endpoint1 = self.initial_endpoints(colours, opaque)
+
+        def encode(endpoint0, endpoint1):
+            word0, word1 = self.quantize_565(endpoint0), self.quantize_565(endpoint1)
+            if not four_colour_only:
+                word0, word1 = self.order_endpoints(word0, word1, wants_four_colour)
+            indices, error = self.assign(colours, opaque, word0, word1, four_colour_only)
+            return word0, word1, indices, error
+
+        word0, word1, indices, error = encode(endpoint0, endpoint1)
+        if self.mode == "quality":
+            for _iteration in range(self.iterations):
+                four_colour = np.ones(len(word0), dtype=bool) if four_colour_only else self.is_four_colour(word0, word1)
+                endpoint0, endpoint1, solvable = self.refit(colours, opaque, indices, four_colour)
+                new_word0, new_word1, new_indices, new_error = encode(endpoint0, endpoint1)
+                better = solvable & (new_error < error)
+                if not better.any():
+                    break
+                word0 = np.where(better, new_word0, word0)
+                word1 = np.where(better, new_word1, word1)
+                indices = np.where(better[:, None], new_indices, indices)
+                error = np.where(better, new_error, error)
+        return word0, word1, indices
@@ -0,0 +1,63 @@
+# texture_prefetch.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PREFETCH_RADIUS = 4
+DEFAULT_PREFETCH_WORKERS = 2
+DEFAULT_INFLIGHT_MB = 64
+
+
+class TexturePrefetcher:
+    """Runs decode jobs for the textures around the selection on a small thread pool.
+
+    Every schedule() supersedes the previous one: jobs that have not started yet are
+    cancelled, while jobs already running finish and keep their result. Jobs are only
+    queued while their estimated memory fits under max_inflight_mb.
+    """
+
+    def __init__(self, workers=DEFAULT_PREFETCH_WORKERS, max_inflight_mb=DEFAULT_INFLIGHT_MB):
+        self.max_inflight = int(max_inflight_mb * 1024 * 1024)
+        self.inflight = 0
+        self._queued = []
+        self._running_keys = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="texture-prefetch")
+
+    def schedule(self, jobs):
+        """Queue jobs, an iterable of (key, estimated_bytes, fn) in priority order."""
+        self.cancel()
+        with self._lock:
+            for key, size, fn in jobs:
+                if key in self._running_keys:
+                    continue  # still being decoded for an earlier selection
+                if self.inflight + size > self.max_inflight:
+                    break
+                self.inflight += size
+                self._running_keys.add(key)
+                future = self._pool.submit(self._run, key, size, fn)
+                self._queued.append((future, key, size))
+
+    def _run(self, key, size, fn):
+        try:
+            fn()
+        except Exception:
+            pass  # the same error is reported if the texture is ever selected
+        finally:
+            self._release(key, size)
+
+    def _release(self, key, size):
+        with self._lock:
+            self.inflight -= size
+            self._running_keys.discard(key)
+
+    def cancel(self):
+        """Drop every job that has not started yet."""
+        with self._lock:
+            queued, self._queued = self._queued, []
+        for future, key, size in queued:
+            if future.cancel():
+                self._release(key, size)
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
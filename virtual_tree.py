@@ -0,0 +1,112 @@
+# virtual_tree.py
+import tkinter as tk
+from tkinter import ttk
+
+WHEEL_ROWS = 3
+
+
+class VirtualTreeview:
+    """Keeps only the visible window of rows in a ttk.Treeview.
+
+    row_source(i) returns (values, tags) for row i and is only called for rows
+    on screen. Items use str(i) as their iid, like a fully populated tree.
+    """
+
+    def __init__(self, tree, scrollbar, row_source):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_source = row_source
+        self.count = 0
+        self.first = 0
+        self.selected = None
+        self.visible_rows = 1
+        try:
+            self.row_height = int(ttk.Style(tree).lookup("Treeview", "rowheight"))
+        except (ValueError, tk.TclError):
+            self.row_height = 20
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", self.on_configure)
+        tree.bind("<MouseWheel>", lambda e: self.scroll(-WHEEL_ROWS if e.delta > 0 else WHEEL_ROWS))
+        tree.bind("<Button-4>", lambda e: self.scroll(-WHEEL_ROWS))
+        tree.bind("<Button-5>", lambda e: self.scroll(WHEEL_ROWS))
+        tree.bind("<Up>", lambda e: self.move_selection(-1))
+        tree.bind("<Down>", lambda e: self.move_selection(1))
+        tree.bind("<Prior>", lambda e: self.move_selection(-self.visible_rows))
+        tree.bind("<Next>", lambda e: self.move_selection(self.visible_rows))
+        tree.bind("<Home>", lambda e: self.select(0))
+        tree.bind("<End>", lambda e: self.select(self.count - 1))
+        tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+
+    def set_count(self, count):
+        """Change the number of rows; only redraws if the visible window is affected."""
+        old_count = self.count
+        self.count = count
+        if count < old_count or old_count < self.first + self.visible_rows:
+            self.refresh()
+        else:
+            self.update_scrollbar()
+
+    def reset(self):
+        self.first = 0
+        self.selected = None
+        self.set_count(0)
+
+    def refresh(self):
+        self.first = max(0, min(self.first, self.count - self.visible_rows))
+        last = min(self.count, self.first + self.visible_rows)
+        self.tree.delete(*self.tree.get_children())
+        for i in range(self.first, last):
+            values, tags = self.row_source(i)
+            self.tree.insert("", "end", iid=str(i), values=values, tags=tags)
+        if self.selected is not None and self.first <= self.selected < last:
+            self.tree.selection_set(str(self.selected))
+            self.tree.focus(str(self.selected))
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if self.count:
+            self.scrollbar.set(self.first / self.count, min(self.count, self.first + self.visible_rows) / self.count)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def on_configure(self, event):
+        # leave room for the heading row
+        rows = max(1, (event.height - self.row_height - 4) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * self.count)
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self.refresh()
+
+    def scroll(self, rows):
+        self.first += rows
+        self.refresh()
+        return "break"
+
+    def move_selection(self, delta):
+        if self.selected is None:
+            return self.select(self.first)
+        return self.select(self.selected + delta)
+
+    def select(self, index):
+        if not self.count:
+            return "break"
+        index = max(0, min(index, self.count - 1))
+        self.selected = index
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible_rows:
+            self.first = index - self.visible_rows + 1
+        self.refresh()
+        return "break"
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = int(selection[0])